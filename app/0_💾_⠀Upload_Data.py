@@ -40,18 +40,16 @@ file = st.file_uploader(label="Upload a CSV file", type="csv")
 
 
 @st.cache_data
-def fetch_isotherm_data(file, a_o):
+def fetch_isotherm_data(file):
     r"""Extracts and returns isotherm data given a .csv file (or buffer)"""
-    isotherm_data = bt.io.import_data(file=file, info="test", a_o=a_o)
+    isotherm_data = bt.io.import_data(file=file)
     return isotherm_data
 
 
 @st.cache_data
-def fetch_bet_results(isotherm_data):
-    r"""Analyzes isotherm data and returns results as a named tuple"""
-    bet_results = bt.core.bet(isotherm_data.iso_df,
-                              isotherm_data.a_o,
-                              isotherm_data.info)
+def fetch_bet_results(iso_df):
+    r"""Analyzes isotherm data and returns results, without the adsorbate area"""
+    bet_results = bt.core.bet(iso_df, a_o=None, info=None)
     return bet_results
 
 
@@ -79,8 +77,10 @@ st.number_input(label=label, key="a_o", step=0.1, format="%.1f")
 
 if ("df" in state) and ("a_o" in state):
     # Fetch and analyze the uploaded data
-    state.isotherm_data = fetch_isotherm_data(file=state.df, a_o=state.a_o)
-    state.bet_results = fetch_bet_results(state.isotherm_data)
+    # the analysis only depends on the data, the adsorbate area only rescales ssa
+    state.isotherm_data = fetch_isotherm_data(file=state.df)._replace(a_o=state.a_o)
+    state.bet_core = fetch_bet_results(state.isotherm_data.iso_df)
+    state.bet_results = bt.core.with_adsorbate(state.bet_core, state.a_o)
     # Plot/show isoterm data    
     tabs = st.tabs(["Plot", "Data"])
     with tabs[0]:
@@ -21,6 +21,12 @@ rcParams["font.sans-serif"] = [
 ]
 
 
+@st.cache_resource
+def fetch_mask_cache(bet_results):
+    r"""Computes the Rouquerol checks of BET results once, to be combined per setting"""
+    return bt.core.RouqMaskCache(*bet_results)
+
+
 def main():
     utils.fill_sidebar()
 
@@ -46,11 +52,7 @@ def main():
             state.min_num_points = 5
         st.slider(label=label, min_value=2, max_value=27, key="min_num_points")
 
-        state.mask_results = bt.core.rouq_mask(
-            intercept=state.bet_results.intercept,
-            iso_df=state.bet_results.iso_df,
-            nm=state.bet_results.nm,
-            slope=state.bet_results.slope,
+        state.mask_results = fetch_mask_cache(state.bet_core).rouq_mask(
             enforce_y_intercept_positive=state.checks[0],
             enforce_pressure_increasing=state.checks[1],
             enforce_absorbed_amount=state.checks[2],
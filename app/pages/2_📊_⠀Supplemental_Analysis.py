@@ -59,12 +59,28 @@ def main():
     # st.radio(label=label, options=options.keys(), key="criterion")
     st.selectbox(label=label, options=options.keys(), key="criterion")
 
-    ssa_answer = bt.core.ssa_answer(
-        state.bet_results,
-        state.mask_results,
-        options[state.criterion]
-    )
-    st.success(f"The specific surface area value is **{ssa_answer:.2f}** $m^2/g$")
+    # best ranges of every criterion, rank 0 is the answer
+    ranked = bt.core.ssa_answers(state.bet_results, state.mask_results)
+    criterion = options[state.criterion]
+    # eg no range has a nonzero error to rank by 'error'
+    if criterion not in ranked.index.get_level_values("criterion"):
+        st.warning("No relative pressure range meets this criterion. "
+                   "Select another criterion or adjust settings to proceed.")
+        return
+    candidates = ranked.loc[criterion]
+    ssa_answer = candidates.ssa.iloc[0]
+    msg = f"The specific surface area value is **{ssa_answer:.2f}** $m^2/g$"
+    # ranges tied with the answer are ranked as documented in ssa_answers
+    column = {"error": "err", "points": "num_pts", "max": "ssa", "min": "ssa"}[criterion]
+    if len(candidates) > 1 and candidates[column].iloc[1] == candidates[column].iloc[0]:
+        rule = "the range ending, then beginning, at the earliest data point"
+        if criterion == "points":
+            rule = "the range with the lowest error, then " + rule
+        msg += (f". Several ranges are tied on this criterion, the answer is "
+                f"{rule}, see the best relative pressure ranges below.")
+    st.success(msg)
+    with st.expander("Best relative pressure ranges"):
+        st.dataframe(candidates)
 
     tabs = st.tabs([
         "BET",
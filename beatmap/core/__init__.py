@@ -7,3 +7,8 @@ core
 """
 
 from ._bet import *
+from ._backends import *
+from ._packed import *
+from ._incremental import *
+from ._masks import *
+from ._window import *
@@ -0,0 +1,161 @@
+import os
+from collections import namedtuple
+
+from beatmap import utils as util
+
+log = util.get_logger(__name__)
+
+__all__ = [
+    "register_backend",
+    "set_backend",
+    "get_backend",
+    "available_backends",
+]
+
+Backend = namedtuple("Backend", "name kernels available loader", defaults=(None,))
+
+# operations that backends can provide, and their signatures
+KERNELS = {
+    "regress_ranges": "(x, y, i, j) -> slope, intercept, r",
+    "fit_error": "(relp, bet, i, j, c, nm) -> err",
+    "absorbed_amount": "(n, nm) -> check3",
+    "pressure_consistency": "(n, relp, nm, slope, intercept, tolerance) -> check4",
+    "single_point": "(n, relp) -> n_median, nm",
+    "ssa_answer": "(bet_results, mask_results, criterion) -> ssa",
+}
+
+_registry = {}
+_default = None
+# names of the unavailable backends a fallback warning was logged for
+_warned = set()
+
+
+def register_backend(name, available=True, loader=None, **kernels):
+    """
+    Adds a compute backend that ``bet``, ``rouq_mask``, ``single_point_bet``
+    and ``ssa_answer`` can dispatch to.
+
+    A backend is a set of kernels, functions that implement the expensive
+    operations of the analysis. Operations a backend does not provide are
+    done by the 'numpy' backend.
+
+    Parameters
+    ----------
+    name : str
+        Name used to select the backend.
+    available : bool
+        False if the backend can not be used, eg because an optional
+        dependency is missing. Selecting it then falls back on 'numpy'.
+    loader : callable
+        If given, a function without arguments that returns more kernels,
+        as a dict keyed by operation. It is called the first time the
+        backend is selected, so that eg an optional dependency is only
+        imported, and kernels only compiled, when the backend is used. If it
+        raises an ImportError the backend is not available.
+    **kernels
+        Kernel functions, keyed by operation. The operations and their
+        signatures are:
+
+        - ``regress_ranges(x, y, i, j) -> slope, intercept, r`` : linear
+          regression of the data points j to i, for arrays of i and j.
+        - ``fit_error(relp, bet, i, j, c, nm) -> err`` : average error of
+          the theoretical BET plot of each range.
+        - ``absorbed_amount(n, nm) -> check3`` : see
+          ``check_absorbed_amount``.
+        - ``pressure_consistency(n, relp, nm, slope, intercept, tolerance)
+          -> check4`` : see ``check_pressure_consistency``.
+        - ``single_point(n, relp) -> n_median, nm`` : median amount
+          adsorbed and single point nm of every range, see
+          ``single_point_bet``.
+        - ``ssa_answer(bet_results, mask_results, criterion) -> ssa`` :
+          see ``ssa_answer``.
+
+    """
+    unknown = set(kernels) - set(KERNELS)
+    if unknown:
+        raise ValueError(f"Unknown kernels: {', '.join(sorted(unknown))}, "
+                         f"must be one of {', '.join(KERNELS)}.")
+    _registry[name] = Backend(name, kernels, available, loader)
+
+
+def set_backend(name):
+    """
+    Sets the backend used when none is passed to a function.
+
+    Parameters
+    ----------
+    name : str or None
+        Name of a registered backend. If None, the ``BEATMAP_BACKEND``
+        environment variable, or 'numpy' if it is not set, is used.
+
+    """
+    global _default
+    if name is not None and name not in _registry:
+        raise ValueError(f"Invalid backend, must be one of {', '.join(_registry)}.")
+    _default = name
+
+
+def get_backend(name=None):
+    """
+    Returns the backend to use for a computation.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend, if None the backend set by ``set_backend`` is
+        returned, or the one named by the ``BEATMAP_BACKEND`` environment
+        variable, or 'numpy'. A backend returned by this function is
+        returned as is, so functions can resolve a backend once and pass it
+        on to others.
+
+    Returns
+    -------
+    backend : namedtuple
+        Contains ``backend.name``, ``backend.kernels`` and
+        ``backend.available``. If the requested backend is not available the
+        'numpy' backend is returned, with a warning the first time.
+
+    """
+    if isinstance(name, Backend):
+        return name
+    if name is None:
+        name = _default or os.environ.get("BEATMAP_BACKEND", "numpy")
+    if name not in _registry:
+        raise ValueError(f"Invalid backend, must be one of {', '.join(_registry)}.")
+    backend = _registry[name]
+    if backend.available and backend.loader is not None:
+        backend = _load(backend)
+    if not backend.available:
+        if name not in _warned:
+            _warned.add(name)
+            log.warning(f"The {name} backend is not available, falling back on numpy.")
+        backend = _registry["numpy"]
+    return backend
+
+
+def _load(backend):
+    """
+    Registers backend again with the kernels returned by its loader, or as
+    not available if the loader raises an ImportError.
+
+    """
+    try:
+        kernels = backend.loader()
+    except ImportError:
+        register_backend(backend.name, available=False, **backend.kernels)
+    else:
+        register_backend(backend.name, **backend.kernels, **kernels)
+    return _registry[backend.name]
+
+
+def available_backends():
+    """Returns the names of the registered backends that can be used."""
+    return [name for name, backend in _registry.items() if backend.available]
+
+
+def kernel(backend, operation):
+    """Returns the function of backend for operation, or the numpy one."""
+    func = backend.kernels.get(operation)
+    if func is None:
+        func = _registry["numpy"].kernels[operation]
+    return func
@@ -1,34 +1,65 @@
+import contextlib
+import glob
+import os
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import numpy as np
+import pandas as pd
 import scipy as sp
 
 from beatmap import io as io
 from beatmap import utils as util
 from beatmap import vis as figs
 
+from . import _numba
+from ._backends import get_backend, kernel, register_backend
+from ._packed import PackedTriangle
+
 log = util.get_logger(__name__)
 
 __all__ = [
     "bet",
+    "bet_reference",
+    "with_adsorbate",
     "single_point_bet",
     "check_y_intercept_positive",
     "check_pressure_increasing",
     "check_absorbed_amount",
     "check_pressure_consistency",
+    "pressure_consistency_difference",
+    "pressure_consistency_sweep",
     "check_enough_datapoints",
     "rouq_mask",
     "ssa_answer",
+    "ssa_answers",
+    "pareto_front",
+    "min_points_sweep",
+    "bet_batch",
     "run_beatmap",
+    "run_beatmap_batch",
+    "BETResults",
+    "RouqMask",
+    "BatchResults",
 ]
 
-SinglePtResults = namedtuple("SinglePtResults", "ssa nm")
+SinglePtResults = namedtuple("SinglePtResults", "ssa nm backend", defaults=(None,))
 ComboResults = namedtuple("ComboResults", "ssa c nm err intercept slope r mask check1 check2 check3 check4 check5 num_pts")
-BETResults = namedtuple("BETResults", "intercept iso_df nm slope ssa c err r num_pts info")
-RouqMask = namedtuple("RouqMask", "mask check1 check2 check3 check4 check5")
+BETResults = namedtuple("BETResults",
+                        "intercept iso_df nm slope ssa c err r num_pts info backend",
+                        defaults=(None,))
+RouqMask = namedtuple("RouqMask", "mask check1 check2 check3 check4 check5 backend",
+                      defaults=(None,))
+BatchResults = namedtuple("BatchResults", "bet_results mask_results")
+
+# maximum number of elements in the temporary arrays used to compute errors
+_ERROR_BLOCK_SIZE = 2 ** 20
+# approximate number of relative pressure ranges bet analyzes at once
+_RANGE_BLOCK_SIZE = 2 ** 16
 
 
-def bet(iso_df, a_o, info, *args):
+def bet(iso_df, a_o, info, *args, packed=False, min_points=None, max_points=None,
+        relp_window=None, backend=None):
     """
     Performs BET analysis on isotherm data for all relative pressure ranges.
 
@@ -44,6 +75,25 @@ def bet(iso_df, a_o, info, *args):
 
     Arrays of results are stored in the bet_results named tuple.
 
+    The linear regressions of all ranges are found at once from cumulative
+    sums of the BET plot coordinates rather than by fitting each range
+    separately. The difference to ``bet_reference``, the original loop based
+    implementation, is floating point round-off in the sums. For ranges of
+    three or more points results agree to within
+
+    * ``nm`` and ``ssa``: rtol 1e-8
+    * ``slope`` and ``intercept``: rtol 1e-8, atol 1e-8 times the largest
+      BET plot value of the isotherm
+    * ``c``: rtol 1e-6, larger where the intercept is close to zero
+    * ``r`` and ``err``: atol 1e-8 (``err`` is in percent)
+
+    The regression of a two point range cancels most of the sums, for these
+    ranges the tolerances of 1e-8 are 1e-3 instead (and 1e-2 for ``c``).
+    Intercepts smaller than the round-off of the sums are set to exactly zero,
+    so ``c`` and ``nm`` are zero there where ``scipy.stats.linregress`` gives
+    a tiny intercept and a huge ``c``. Use ``backend="reference"`` when exact
+    parity with the original implementation is needed.
+
     Indexing of named tuple elements is in order of priority, data used by
     other function are given priority.
 
@@ -57,9 +107,39 @@ def bet(iso_df, a_o, info, *args):
         Isotherm data, output by a data import function.
     a_o : float
         Cross sectional area of adsorbate, in square Angstrom, output by a
-        data import function.
+        data import function. If None, the specific surface area is not
+        calculated, ``bet_results.ssa`` is None, and can be added later with
+        ``with_adsorbate``.
     info : str
         Adsorbate-adsorbent information, output by a data import function.
+    packed : bool
+        If True the arrays of results are returned as ``PackedTriangle``
+        objects, which only store the cells below the diagonal, instead of
+        2D ndarrays. Packed results use less than half the memory and can be
+        passed to ``rouq_mask``, ``ssa_answer`` and the ``vis`` functions.
+        Ranges are analyzed in blocks of rows written straight into the
+        results, so the peak memory use is close to the size of the results.
+    min_points : int
+        If given, relative pressure ranges with fewer data points are not
+        analyzed.
+    max_points : int
+        If given, relative pressure ranges with more data points are not
+        analyzed.
+    relp_window : tuple of float
+        If given, (low, high), only relative pressure ranges that start at or
+        above low and end at or below high are analyzed.
+    backend : str
+        Name of the compute backend, eg 'numpy', 'reference' (the original
+        loops, for validation), 'threaded' or 'numba' (requires Numba), see
+        ``register_backend``. Defaults to the backend set with
+        ``set_backend``, else the ``BEATMAP_BACKEND`` environment variable,
+        else 'numpy'.
+
+    Ranges excluded by ``min_points``, ``max_points`` or ``relp_window`` are
+    skipped entirely, their results are zero, as for the unused half of the
+    arrays, and ``rouq_mask`` marks them invalid. On dense isotherms this
+    avoids most of the work when only part of the isotherm can give valid
+    ranges.
 
     Returns
     -------
@@ -93,64 +173,349 @@ def bet(iso_df, a_o, info, *args):
           experimental data points per relative pressure range.
         - ``bet_results.info`` (str) : string of adsorbate-adsorbent
           info by other functions to name files.
+        - ``bet_results.backend`` (str) : name of the backend that
+          produced the results.
 
     """
-    ssa_array = np.zeros((len(iso_df), len(iso_df)))
-    c_array = np.zeros((len(iso_df), len(iso_df)))
-    nm_array = np.zeros((len(iso_df), len(iso_df)))
-    err_array = np.zeros((len(iso_df), len(iso_df)))
-    slope = np.zeros((len(iso_df), len(iso_df)))
-    intercept = np.zeros((len(iso_df), len(iso_df)))
-    r = np.zeros((len(iso_df), len(iso_df)))
-    bet_c = np.zeros(len(iso_df))
-    number_pts = np.zeros((len(iso_df), len(iso_df)))
+    relp = iso_df.relp.values
+    bet_vals = iso_df.bet.values
+    num_pts = len(iso_df)
+    backend = get_backend(backend)
+    regress_ranges = kernel(backend, "regress_ranges")
+    fit_error = kernel(backend, "fit_error")
+
+    # ranges are analyzed in blocks of rows written straight into the
+    # results, so temporary arrays only hold one block at a time
+    shape = (num_pts * (num_pts - 1) // 2,) if packed else (num_pts, num_pts)
+    arrays = {field: np.zeros(shape)
+              for field in ("intercept", "nm", "slope", "c", "err", "r", "num_pts")}
+    for i, j in _range_blocks(num_pts, _RANGE_BLOCK_SIZE):
+        i, j = _constrain_ranges(relp, i, j, min_points, max_points, relp_window)
+        if len(i) == 0:
+            continue
+        slope, intercept, r = regress_ranges(relp, bet_vals, i, j)
+        c, nm = _bet_constants(slope, intercept)
+        cells = i * (i - 1) // 2 + j if packed else (i, j)
+        arrays["intercept"][cells] = np.nan_to_num(intercept)
+        arrays["nm"][cells] = nm
+        arrays["slope"][cells] = slope
+        arrays["c"][cells] = c
+        arrays["err"][cells] = fit_error(relp, bet_vals, i, j, c, nm)
+        arrays["r"][cells] = r
+        arrays["num_pts"][cells] = i - j + 1.0
+    if packed:
+        arrays = {field: PackedTriangle(values, num_pts)
+                  for field, values in arrays.items()}
+
+    results = BETResults(iso_df=iso_df, ssa=None, info=info, backend=backend.name,
+                         **arrays)
+    if a_o is not None:
+        results = with_adsorbate(results, a_o)
+    return results
 
-    for i in range(len(iso_df)):
-        for j in range(len(iso_df)):
-            if i > j:
-                a = iso_df.iloc[j : i + 1]
-                X = a.relp
-                y = a.bet
-                m, b, r_value, p_value, std_err = sp.stats.linregress(X, y)
-                slope[i, j] = m
-                intercept[i, j] = b
-                r[i, j] = r_value
-                c = 0
-                nm = 0
+
+def with_adsorbate(bet_results, a_o, info=None):
+    """
+    Returns BET results with the specific surface area for an adsorbate.
+
+    Only the specific surface area depends on the cross sectional area of
+    the adsorbate, it is proportional to nm. Results of ``bet`` can be
+    computed once, with or without an a_o, and rescaled for any adsorbate
+    without repeating the analysis.
+
+    Parameters
+    ----------
+    bet_results : namedtuple
+        Output of the bet function.
+    a_o : float
+        Cross sectional area of adsorbate, in square Angstrom.
+    info : str
+        Adsorbate-adsorbent information, if None ``bet_results.info`` is
+        kept.
+
+    Returns
+    -------
+    bet_results : namedtuple
+        Copy of bet_results with ``bet_results.ssa`` calculated from a_o,
+        and ``bet_results.info`` replaced if given. Other arrays are shared
+        with the input.
+
+    """
+    nm = bet_results.nm
+    if isinstance(nm, PackedTriangle):
+        ssa = PackedTriangle(_surface_area(nm.data, a_o), nm.num_points)
+    else:
+        ssa = _surface_area(np.asarray(nm), a_o)
+    info = bet_results.info if info is None else info
+    return bet_results._replace(ssa=ssa, info=info)
+
+
+def _surface_area(n, a_o):
+    """
+    Returns the specific surface area, in m^2/g, covered by n mol/g of an
+    adsorbate with a cross sectional area of a_o square Angstrom.
+
+    """
+    return n * 6.022 * 10 ** 23 * a_o * 10 ** -20
+
+
+def _require_ssa(bet_results):
+    """Raises a ValueError if bet_results have no specific surface area."""
+    if bet_results.ssa is None:
+        raise ValueError("No specific surface area, bet was run without a_o. Add it "
+                         "with with_adsorbate(bet_results, a_o) first.")
+
+
+def bet_reference(iso_df, a_o, info, *args):
+    """
+    Performs BET analysis on isotherm data for all relative pressure ranges,
+    fitting every range with its own call to ``scipy.stats.linregress``.
+
+    Same as ``bet(iso_df, a_o, info, backend="reference")``, the original,
+    loop based implementation. It is slow (the cost grows with the cube of
+    the number of data points) but simple, and is kept as a reference to
+    validate the vectorized engine used by ``bet`` against. Parameters and
+    returns are the same as ``bet``.
+
+    """
+    return bet(iso_df, a_o, info, backend="reference")
+
+
+def _range_indices(num_points):
+    """
+    Returns the indices of the last and first data point of every relative
+    pressure range, ie the (i, j) coordinates with i > j, in row-major order.
+
+    """
+    return np.tril_indices(num_points, -1)
+
+
+def _range_blocks(num_points, size):
+    """
+    Yields the (i, j) indices of the relative pressure ranges in blocks of
+    whole rows, in row-major order, with about size ranges per block.
+
+    """
+    start = 1
+    while start < num_points:
+        # row i starts at cell i * (i - 1) / 2 of the packed triangle
+        end_cell = start * (start - 1) // 2 + size
+        stop = int((1 + np.sqrt(1 + 8 * end_cell)) // 2)
+        stop = min(max(stop, start + 1), num_points)
+        rows = np.arange(start, stop)
+        i = np.repeat(rows, rows)
+        j = np.arange(len(i)) - np.repeat(np.cumsum(rows) - rows, rows)
+        yield i, j
+        start = stop
+
+
+def _constrain_ranges(relp, i, j, min_points=None, max_points=None, relp_window=None):
+    """
+    Returns the (i, j) indices of the relative pressure ranges that satisfy
+    the constraints on the number of points and relative pressures, see
+    ``bet``.
+
+    """
+    keep = np.ones(len(i), dtype=bool)
+    if min_points is not None:
+        keep &= i - j + 1 >= min_points
+    if max_points is not None:
+        keep &= i - j + 1 <= max_points
+    if relp_window is not None:
+        low, high = relp_window
+        keep &= (relp[j] >= low) & (relp[i] <= high)
+    return i[keep], j[keep]
+
+
+def _to_dense(values, i, j, num_points):
+    """
+    Scatters values computed for the ranges (i, j) into a 2D array, cells
+    that do not correspond to a range are zero.
+
+    """
+    dense = np.zeros(values.shape[:-1] + (num_points, num_points))
+    dense[..., i, j] = values
+    return dense
+
+
+def _regress_ranges(x, y, i, j):
+    """
+    Fits a straight line to every range of data points at once.
+
+    The sums needed by least squares (of x, y, x^2, y^2 and xy) for the range
+    from point j to point i are differences of cumulative sums, so no range
+    is fitted individually. The data are shifted to zero mean first to limit
+    cancellation in the sums of squares. Intercepts that are within the
+    round-off of the sums of zero (eg for a line through a data point at the
+    origin) are set to exactly zero.
+
+    Parameters
+    ----------
+    x : ndarray
+        Independent variable, the last axis indexes the data points. Any
+        leading axes are treated as separate data sets.
+    y : ndarray
+        Dependent variable, same shape as ``x``.
+    i : ndarray
+        Index of the last data point of each range.
+    j : ndarray
+        Index of the first data point of each range.
+
+    Returns
+    -------
+    slope, intercept, r : ndarray
+        Results of the linear regression of each range, as returned by
+        ``scipy.stats.linregress``. The last axis indexes the ranges.
+
+    """
+    x_shift = x.mean(axis=-1, keepdims=True)
+    y_shift = y.mean(axis=-1, keepdims=True)
+    sums = _cumulative_sums(x - x_shift, y - y_shift)
+    round_off = x.shape[-1] * np.finfo(float).eps * np.abs(y).max(axis=-1, keepdims=True)
+    return _regress_sums(sums, i, j, x_shift, y_shift, round_off)
+
+
+def _cumulative_sums(x, y):
+    """
+    Returns the cumulative sums of x, y, x^2, y^2 and xy stacked along the
+    second to last axis. The sums start with a zero so the sums over the
+    range from point j to point i are ``sums[..., i + 1] - sums[..., j]``.
+
+    """
+    terms = np.stack(np.broadcast_arrays(x, y, x * x, y * y, x * y), axis=-2)
+    sums = np.zeros(terms.shape[:-1] + (terms.shape[-1] + 1,))
+    np.cumsum(terms, axis=-1, out=sums[..., 1:])
+    return sums
+
+
+def _regress_sums(sums, i, j, x_shift, y_shift, round_off):
+    """
+    Linear regressions of the ranges (i, j) from the cumulative sums of data
+    shifted by ``x_shift`` and ``y_shift``, see ``_regress_ranges``.
+
+    """
+    sx, sy, sxx, syy, sxy = np.moveaxis(sums[..., i + 1] - sums[..., j], -2, 0)
+
+    n = i - j + 1
+    x_mean = sx / n
+    y_mean = sy / n
+    ssxm = np.maximum(sxx - sx * x_mean, 0)
+    ssym = np.maximum(syy - sy * y_mean, 0)
+    ssxym = sxy - sx * y_mean
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = ssxym / ssxm
+        r_den = np.sqrt(ssxm * ssym)
+        r = np.where(r_den == 0, 0.0, ssxym / r_den)
+    r = np.clip(r, -1.0, 1.0)
+    intercept = (y_mean + y_shift) - slope * (x_mean + x_shift)
+    intercept[np.abs(intercept) <= round_off] = 0
+
+    return slope, intercept, r
+
+
+def _bet_constants(slope, intercept):
+    """
+    Returns the BET constant and monolayer amount given the slope and
+    intercept of BET plot trendlines, both are zero where the intercept is
+    zero.
+
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.where(intercept != 0, slope / intercept + 1, 0.0)
+        nm = np.where(intercept != 0, 1 / (intercept * c), 0.0)
+    return c, nm
+
+
+def _fit_error(relp, bet_vals, i, j, c, nm):
+    """
+    Returns the average error between the BET plot data points of each range
+    and the BET plot of the theoretical isotherm fitted to that range.
+
+    The error is normalized for the interval of relative pressures used to
+    compute C, so, min and max error corresponds to the best and worst fit
+    over the interval used in BET analysis, not the entire isotherm. Two
+    point ranges have zero error.
+
+    Ranges are processed in blocks, the theoretical BET plot of every range
+    in a block is evaluated at once by broadcasting. The size of the blocks
+    is chosen so that temporary arrays hold at most ``_ERROR_BLOCK_SIZE``
+    elements.
+
+    """
+    err = np.zeros(c.shape)
+    num_sets = int(np.prod(c.shape[:-1]))
+    step = max(1, _ERROR_BLOCK_SIZE // (num_sets * relp.shape[-1]))
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for start in range(0, len(i), step):
+            block = slice(start, start + step)
+            lo, hi = j[block].min(), i[block].max() + 1
+            x = relp[..., None, lo:hi]
+            y = bet_vals[..., None, lo:hi]
+            c_b = c[..., block, None]
+            nm_b = nm[..., block, None]
+            bet_c = np.where(nm_b != 0,
+                             (1 / (nm_b * c_b)) + (c_b - 1) * x / (nm_b * c_b),
+                             0.0)
+            errors = np.nan_to_num(abs(bet_c - y) / bet_c)
+            k = np.arange(lo, hi)
+            window = (k >= j[block, None]) & (k <= i[block, None])
+            num_pts = i[block] + 1 - j[block]
+            err[..., block] = 100 * np.where(window, errors, 0).sum(axis=-1) / num_pts
+
+    err[..., i - j == 1] = 0
+    return err
+
+
+def _fit_error_threaded(relp, bet_vals, i, j, c, nm):
+    """Same as ``_fit_error``, with the ranges split over a pool of threads."""
+    num_threads = os.cpu_count() or 1
+    chunks = np.array_split(np.arange(len(i)), 4 * num_threads)
+
+    def fit_error(k):
+        return _fit_error(relp, bet_vals, i[k], j[k], c[..., k], nm[..., k])
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        return np.concatenate(list(executor.map(fit_error, chunks)), axis=-1)
+
+
+def _regress_ranges_loop(x, y, i, j):
+    """
+    Same as ``_regress_ranges`` for one isotherm, fitting every range
+    separately with ``scipy.stats.linregress``.
+
+    """
+    slope = np.zeros(len(i))
+    intercept = np.zeros(len(i))
+    r = np.zeros(len(i))
+    for k in range(len(i)):
+        m, b, r_value, p_value, std_err = sp.stats.linregress(x[j[k]:i[k] + 1],
+                                                              y[j[k]:i[k] + 1])
+        slope[k] = m
+        intercept[k] = b
+        r[k] = r_value
+    return slope, intercept, r
+
+
+def _fit_error_loop(relp, bet_vals, i, j, c, nm):
+    """Same as ``_fit_error`` for one isotherm, one range at a time."""
+    err = np.zeros(len(i))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(len(i)):
+            if i[k] - j[k] == 1:
+                continue
+            rows = slice(j[k], i[k] + 1)
+            if nm[k] != 0:
+                bet_c = (1 / (nm[k] * c[k])) + (c[k] - 1) * relp[rows] / (nm[k] * c[k])
+            else:
                 bet_c = 0
-                if b != 0:
-                    c = m / b + 1  # avoiding divide by zero issues
-                    nm = 1 / (b * c)
-                    bet_c = (1 / (nm * c)) + (c - 1) * iso_df.relp / (nm * c)
-                spec_sa = nm * 6.022 * 10 ** 23 * a_o * 10 ** -20
-                ssa_array[i, j] = spec_sa
-                c_array[i, j] = c
-                nm_array[i, j] = nm
-                number_pts[i, j] = i - j + 1
-                errors = np.nan_to_num(abs(bet_c - iso_df.bet) / bet_c)
-                if i - j == 1:
-                    err_array[i, j] = 0
-                else:
-                    err_array[i, j] = 100 * sum(errors[j : i + 1]) / (i + 1 - j)
-                # error is normalized for the interval of relative pressures
-                # used to compute C, so, min and max error corresponds to the
-                # best and worst fit over the interval used in BET analysis,
-                # not the entire isotherm
-
-                results = BETResults(np.nan_to_num(intercept),
-                                     iso_df,
-                                     nm_array,
-                                     slope,
-                                     ssa_array,
-                                     c_array,
-                                     err_array,
-                                     r,
-                                     number_pts,
-                                     info)
-    return results
+            errors = np.nan_to_num(abs(bet_c - bet_vals[rows]) / bet_c)
+            err[k] = 100 * sum(errors) / (i[k] + 1 - j[k])
+    return err
 
 
-def single_point_bet(df, a_o):
+def single_point_bet(df, a_o, backend=None):
     """
     Performs single point BET analysis on an isotherm data set for all
     relative pressure ranges. Can be used to check for agreement between BET
@@ -165,6 +530,8 @@ def single_point_bet(df, a_o):
         - ``bet_results.raw_data`` (DataFrame) : experimental isotherm data.
         - ``bet_results.a_o`` (flaot) : the cross sectional area of the
           adsorbate molecule, in square angstrom.
+    backend : str
+        Name of the compute backend, see ``bet``.
 
     Returns
     -------
@@ -173,27 +540,66 @@ def single_point_bet(df, a_o):
 
         - ``singlept_results.ssa`` (ndarray) : 2D array of specific surface
           area values, in m^2/g, indicies correspond to first and last
-          datapoint used in the analysis.
+          datapoint used in the analysis. None if a_o is None.
         - ``singlept_results.nm`` (ndarray) : 2D array of monolayer adsorbed
           amounts, in mol/g, indicies correspond to first and last datapoint
           used in the analysis.
+        - ``singlept_results.backend`` (str) : name of the backend that
+          produced the results.
 
     """
-    ssa_array = np.zeros((len(df), len(df)))
-    nm_array = np.zeros((len(df), len(df)))
+    backend = get_backend(backend)
+    n = np.asarray(df.n, dtype=float)
+    relp = np.asarray(df.relp, dtype=float)
+    n_array, nm_array = kernel(backend, "single_point")(n, relp)
+    ssa_array = None if a_o is None else _surface_area(n_array, a_o)
 
-    for i in range(len(df)):
-        for j in range(len(df)):
+    return SinglePtResults(ssa_array, nm_array, backend.name)
+
+
+def _single_point_loop(n, relp):
+    """
+    Returns the median amount adsorbed and the single point nm of every
+    relative pressure range, see ``single_point_bet``.
+
+    """
+    n_array = np.zeros((len(n), len(n)))
+    nm_array = np.zeros((len(n), len(n)))
+
+    for i in range(len(n)):
+        for j in range(len(n)):
             if i > j:
-                n_range = df.n[j:i]
-                relp_range = df.relp[j:i]
-                n = np.ma.median(n_range)
-                relp = np.ma.median(relp_range)
+                n_median = np.ma.median(n[j:i])
+                relp_median = np.ma.median(relp[j:i])
+
+                nm_array[i, j] = n_median * (1 - relp_median)
+                n_array[i, j] = n_median
 
-                nm_array[i, j] = n * (1 - relp)
-                ssa_array[i, j] = n * 6.022 * 10 ** 23 * a_o * 10 ** -20
+    return n_array, nm_array
 
-    return SinglePtResults(ssa_array, nm_array)
+
+def _single_point(n, relp):
+    """
+    Same as ``_single_point_loop``, with the medians of all ranges of the
+    same length found at once from a sliding window over the data points.
+
+    """
+    num_points = len(n)
+    n_array = np.zeros((num_points, num_points))
+    nm_array = np.zeros((num_points, num_points))
+    data = np.stack((n, relp))
+
+    # ranges use the data points j to i - 1
+    for length in range(1, num_points):
+        windows = np.lib.stride_tricks.sliding_window_view(data, length, axis=1)
+        step = max(_ERROR_BLOCK_SIZE // length, 1)
+        for start in range(0, num_points - length, step):
+            j = np.arange(start, min(start + step, num_points - length))
+            n_median, relp_median = np.median(windows[:, j], axis=-1)
+            n_array[j + length, j] = n_median
+            nm_array[j + length, j] = n_median * (1 - relp_median)
+
+    return n_array, nm_array
 
 
 def check_y_intercept_positive(intercept):
@@ -240,10 +646,10 @@ def check_pressure_increasing(df):
         ranges that fail this check.
 
     """
-    df["check2"] = df.n * (1 - df.relp)
+    n_relp = df.n * (1 - df.relp)
     check2 = np.ones((len(df), len(df)))
-    minus1 = np.concatenate(([0], df.check2[:-1]))
-    test = df.check2 - minus1 >= 0
+    minus1 = np.concatenate(([0], n_relp[:-1]))
+    test = n_relp - minus1 >= 0
     test = np.tile(test, (len(df), 1))
     check2 = check2 * test
     check2 = check2.T
@@ -254,19 +660,23 @@ def check_pressure_increasing(df):
     return check2
 
 
-def check_absorbed_amount(df, nm):
+def check_absorbed_amount(df, nm, backend=None):
     """
     Checks that nm, amount adsorbed in the monolayer, is in the range of
     data points used in BET analysis.
 
     Parameters
     ----------
-    df : dataframe
-        Dataframe of imported experimental isothermal adsorption data.
+    df : dataframe or ndarray
+        Dataframe of imported experimental isothermal adsorption data. An
+        array of the amounts adsorbed, n, or a 2D array with n in the second
+        column, as in the dataframe, can be given instead.
     nm : array
         2D array of BET specific amount of adsorbate in the monolayer, the
         coordinates of the array corresponding to relative pressures, units
         [moles / gram].
+    backend : str
+        Name of the compute backend, see ``bet``.
 
     Returns
     -------
@@ -276,20 +686,33 @@ def check_absorbed_amount(df, nm):
         fail this check.
 
     """
-    check3 = np.zeros((len(df), len(df)))
+    if isinstance(df, pd.DataFrame):
+        n = np.asarray(df.iloc[:, 1], dtype=float)
+    else:
+        n = np.asarray(df, dtype=float)
+        n = n[:, 1] if n.ndim == 2 else n
+    absorbed_amount = kernel(get_backend(backend), "absorbed_amount")
+    check3 = absorbed_amount(n, np.asarray(nm, dtype=float))
+
+    if np.any(check3) is False:
+        log.warning("All relative pressure ranges fail criterion 3: monolayer amount")
+
+    return check3
+
+
+def _absorbed_amount_loop(n, nm):
+    """Check3 one relative pressure range at a time, see ``check_absorbed_amount``."""
+    check3 = np.zeros((len(n), len(n)))
 
     for i in range(np.shape(check3)[0]):
         for j in range(np.shape(check3)[1]):
-            if df.iloc[j, 1] <= nm[i, j] <= df.iloc[i, 1]:
+            if n[j] <= nm[i, j] <= n[i]:
                 check3[i, j] = 1
 
-    if np.any(check3) is False:
-        log.warning("All relative pressure ranges fail criterion 3: monolayer amount")
-
     return check3
 
 
-def check_pressure_consistency(df, nm, slope, intercept):
+def check_pressure_consistency(df, nm, slope, intercept, backend=None, tolerance=0.1):
     """
     Checks that relative pressure is consistent.
 
@@ -297,7 +720,7 @@ def check_pressure_consistency(df, nm, slope, intercept):
     interpolation of the experiemental data. A second relative pressure is
     found by setting n to nm in the BET equation and solving for relative
     pressure. The two relative pressures are compared and must agree within
-    10% to pass this check.
+    10%, or the given tolerance, to pass this check.
 
     Parameters
     ----------
@@ -313,6 +736,12 @@ def check_pressure_consistency(df, nm, slope, intercept):
     intercept : array
         2D array of y-intercept values resulting from linear regression
         applied to relevant experimental data.
+    backend : str
+        Name of the compute backend, see ``bet``.
+    tolerance : float
+        Maximum relative difference between the two relative pressures,
+        default value is 0.1. To evaluate many tolerances, see
+        ``pressure_consistency_difference``.
 
     Returns
     -------
@@ -321,32 +750,13 @@ def check_pressure_consistency(df, nm, slope, intercept):
         that do not agree within 10%, ie ranges that fail this check.
 
     """
-    check4 = np.zeros((len(df), len(df)))
-
-    for i in range(np.shape(check4)[0]):
-        for j in range(np.shape(check4)[1]):
-            if nm[i, j] != 0 and i > 0 and j > 0:
-                # find relp corresponding to nm
-                relpm = util.lin_interp(df, nm[i, j])
-                # BET eq solved for relp is a quadratic, coeff = [a, b, c]
-                coeff = [
-                    -1 * slope[i, j] * nm[i, j],
-                    slope[i, j] * nm[i, j] - 1 - intercept[i, j] * nm[i, j],
-                    intercept[i, j] * nm[i, j],
-                ]
-                # find roots
-                # (relp value where nm occurs on theoretical isotherm)
-                roots = np.roots(coeff)  # note: some roots are imaginary
-                roots = [item.real for item in roots if len(roots) == 2]
-                # find the difference between
-                relp_m_1 = roots[0]
-                diff_1 = abs((relp_m_1 - relpm) / relpm)
-                relp_m_2 = roots[1]
-                diff_2 = abs((relp_m_2 - relpm) / relpm)
-                diff = min(diff_1, diff_2)
-
-                if diff < 0.1:
-                    check4[i, j] = 1
+    pressure_consistency = kernel(get_backend(backend), "pressure_consistency")
+    check4 = pressure_consistency(np.asarray(df.n, dtype=float),
+                                  np.asarray(df.relp, dtype=float),
+                                  np.asarray(nm, dtype=float),
+                                  np.asarray(slope, dtype=float),
+                                  np.asarray(intercept, dtype=float),
+                                  tolerance)
 
     if np.any(check4) is False:
         log.warning("All relative pressure ranges fail criterion 4: pressure consistency")
@@ -354,6 +764,205 @@ def check_pressure_consistency(df, nm, slope, intercept):
     return check4
 
 
+def _pressure_consistency_loop(n, relp, nm, slope, intercept, tolerance=0.1):
+    """
+    Check4 one relative pressure range at a time, see
+    ``check_pressure_consistency``.
+
+    """
+    check4 = np.zeros((len(n), len(n)))
+
+    i, j = np.nonzero(nm)
+    keep = (i > 0) & (j > 0)
+    i, j = i[keep], j[keep]
+    df = pd.DataFrame({"relp": relp, "n": n})
+    check4[i, j] = _pressure_consistency_cells(df, nm[i, j], slope[i, j], intercept[i, j],
+                                               tolerance)
+
+    return check4
+
+
+def _pressure_consistency_cells(df, nm, slope, intercept, tolerance=0.1):
+    """
+    Check4 for a list of relative pressure ranges given the nm, slope and
+    intercept of each, see ``check_pressure_consistency``.
+
+    """
+    check4 = np.zeros(len(nm))
+
+    for k in range(len(nm)):
+        # find relp corresponding to nm
+        relpm = util.lin_interp(df, nm[k])
+        # BET eq solved for relp is a quadratic, coeff = [a, b, c]
+        coeff = [
+            -1 * slope[k] * nm[k],
+            slope[k] * nm[k] - 1 - intercept[k] * nm[k],
+            intercept[k] * nm[k],
+        ]
+        # find roots
+        # (relp value where nm occurs on theoretical isotherm)
+        roots = np.roots(coeff)  # note: some roots are imaginary
+        roots = [item.real for item in roots if len(roots) == 2]
+        # find the difference between
+        relp_m_1 = roots[0]
+        diff_1 = abs((relp_m_1 - relpm) / relpm)
+        relp_m_2 = roots[1]
+        diff_2 = abs((relp_m_2 - relpm) / relpm)
+        diff = min(diff_1, diff_2)
+
+        if diff < tolerance:
+            check4[k] = 1
+
+    return check4
+
+
+def pressure_consistency_difference(df, nm, slope, intercept):
+    """
+    Returns the relative difference between the two relative pressures
+    compared by ``check_pressure_consistency``, for every relative pressure
+    range.
+
+    A range passes check4 with a tolerance t if its difference is less than
+    t. The differences can be computed once and turned into check4 arrays
+    for any number of tolerances with ``pressure_consistency_sweep``.
+
+    Parameters
+    ----------
+    df : dataframe
+        Dataframe of imported experimental isothermal adsorption data.
+    nm : array
+        2D array of BET specific amount of adsorbate in the monolayer.
+    slope : array
+        2D array of slope values.
+    intercept : array
+        2D array of y-intercept values.
+
+    Returns
+    -------
+    ndarray
+        2D array of relative differences, abs(relp_BET - relp_m) / relp_m,
+        where relp_m is interpolated from the data and relp_BET is the root
+        of the BET equation closest to it. Ranges that check4 does not
+        evaluate (first data point, nm of zero) are nan, ranges where the
+        BET equation has no quadratic term are inf.
+
+    """
+    return _pressure_difference(np.asarray(df.n, dtype=float),
+                                np.asarray(df.relp, dtype=float),
+                                np.asarray(nm, dtype=float),
+                                np.asarray(slope, dtype=float),
+                                np.asarray(intercept, dtype=float))
+
+
+def pressure_consistency_sweep(difference, tolerances):
+    """
+    Returns check4 for several tolerances at once.
+
+    Parameters
+    ----------
+    difference : array
+        Relative differences output by ``pressure_consistency_difference``,
+        or a stack of them for several isotherms with the same number of
+        data points.
+    tolerances : array_like
+        Tolerances to evaluate.
+
+    Returns
+    -------
+    ndarray
+        Boolean array of shape ``(len(tolerances),) + difference.shape``,
+        False where a range fails check4 with the corresponding tolerance.
+
+    Examples
+    --------
+    Fraction of ranges that pass check4 as a function of tolerance:
+
+    >>> difference = pressure_consistency_difference(*bet_results[:4])  # doctest: +SKIP
+    >>> tolerances = np.linspace(0.01, 0.5, 50)
+    >>> passed = pressure_consistency_sweep(difference, tolerances)  # doctest: +SKIP
+    >>> fraction = passed.mean(axis=(-2, -1))  # doctest: +SKIP
+
+    """
+    difference = np.asarray(difference, dtype=float)
+    tolerances = np.asarray(tolerances, dtype=float)
+    return difference < tolerances.reshape(tolerances.shape + (1,) * difference.ndim)
+
+
+def _pressure_consistency(n, relp, nm, slope, intercept, tolerance=0.1):
+    """
+    Same as ``_pressure_consistency_loop``, for all relative pressure ranges
+    at once, and for isotherms stacked along the leading axis.
+
+    """
+    difference = _pressure_difference(n, relp, nm, slope, intercept)
+    with np.errstate(invalid="ignore"):
+        return (difference < tolerance).astype(float)
+
+
+def _pressure_difference(n, relp, nm, slope, intercept):
+    """
+    Relative difference of check4 of every relative pressure range, see
+    ``pressure_consistency_difference``. Isotherms with the same number of
+    data points can be stacked along the leading axis.
+
+    """
+    difference = np.full(nm.shape, np.nan)
+
+    # ranges where the nm of any of the stacked isotherms is not zero
+    i, j = np.nonzero(np.any(nm != 0, axis=tuple(range(nm.ndim - 2))))
+    keep = (i > 0) & (j > 0)
+    i, j = i[keep], j[keep]
+    nm = nm[..., i, j]
+    cells = _pressure_difference_ranges(n, relp, nm, slope[..., i, j],
+                                        intercept[..., i, j])
+    difference[..., i, j] = np.where((nm != 0) & ~np.isnan(nm), cells, np.nan)
+
+    return difference
+
+
+def _pressure_consistency_ranges(n, relp, nm, slope, intercept, tolerance=0.1):
+    """
+    Same as ``_pressure_consistency_cells`` given the data points as arrays,
+    with the interpolations and roots found for all ranges at once.
+
+    """
+    difference = _pressure_difference_ranges(n, relp, nm, slope, intercept)
+    with np.errstate(invalid="ignore"):
+        return (difference < tolerance).astype(float)
+
+
+def _pressure_difference_ranges(n, relp, nm, slope, intercept):
+    """
+    Relative difference of check4 for a list of relative pressure ranges,
+    the last axis of nm, slope and intercept. Isotherms with the same
+    number of data points can be stacked along the leading axis.
+
+    Complex roots are replaced by their real part, as in the loop. The
+    difference is inf where the quadratic coefficient is zero, where
+    ``np.roots`` finds a single root and the loop fails.
+
+    """
+    # find relp corresponding to nm
+    relpm = util.lin_interp_array(n, relp, nm)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # BET eq solved for relp is a quadratic, qa relp^2 + qb relp + qc = 0
+        qa = -1 * slope * nm
+        qb = slope * nm - 1 - intercept * nm
+        qc = intercept * nm
+        disc = qb ** 2 - 4 * qa * qc
+        # numerically stable form of the roots, real parts if complex
+        q = -0.5 * (qb + np.copysign(np.sqrt(np.maximum(disc, 0)), qb))
+        root_1 = np.where(disc < 0, -qb / (2 * qa), q / qa)
+        root_2 = np.where(disc < 0, root_1, np.where(q != 0, qc / q, 0))
+
+        diff_1 = abs((root_1 - relpm) / relpm)
+        diff_2 = abs((root_2 - relpm) / relpm)
+        # same as min(diff_1, diff_2), including for nan
+        diff = np.where(diff_2 < diff_1, diff_2, diff_1)
+
+    return np.where(qa != 0, diff, np.inf)
+
+
 def check_enough_datapoints(df, points=5):
     """
     Checks that relative pressure ranges contain a minimum number of data points.
@@ -373,12 +982,7 @@ def check_enough_datapoints(df, points=5):
         that contain less than the minimum number of points.
 
     """
-    check5 = np.ones((len(df), len(df)))
-
-    for i in range(len(df)):
-        for j in range(len(df)):
-            if i - j < points - 1:
-                check5[i, j] = 0
+    check5 = _enough_datapoints(len(df), points)
 
     if np.any(check5) is False:
         log.warning("All relative pressure ranges fail criterion 5: enough data points")
@@ -392,7 +996,8 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
               enforce_absorbed_amount=True,
               enforce_relative_pressure=True,
               enforce_enough_datapoints=True,
-              min_num_points=5):
+              min_num_points=5,
+              backend=None):
     """
     Calls all check functions and combines their masks into one "rouqerol mask".
 
@@ -400,6 +1005,16 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
     ``bet_results`` (where ``bet_results`` is a named tuple output by the bet
     function).
 
+    Relative pressure ranges with an nm of zero, ie ranges that were skipped
+    by the bet function or where the BET constant could not be calculated,
+    are always invalid.
+
+    If intercept, nm and slope are ``PackedTriangle`` objects, eg the results
+    of ``bet(..., packed=True)``, the checks are evaluated on the cells below
+    the diagonal only, with numpy whatever the backend, and the mask and
+    checks are returned as ``PackedTriangle`` objects as well. Cells on or
+    above the diagonal of the packed mask are True, ie invalid.
+
     Parameters
     ----------
     intercept : ndarray
@@ -423,6 +1038,8 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
     min_num_points : int
         The minimum number of experimental data points for a relative pressure
         interval to be considered valid.
+    backend : str
+        Name of the compute backend, see ``bet``.
 
     Returns
     -------
@@ -442,14 +1059,17 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
           failing check4.
         - ``rouq_mask.check5`` (ndarray) : array of 1s and 0s where 0 corresponds
           failing check5.
+        - ``rouq_mask.backend`` (str) : name of the backend that produced
+          the results.
 
     """
+    backend = get_backend(backend)
 
-    mask = np.ones((len(iso_df), len(iso_df)))
-    for i in range(len(iso_df)):
-        for j in range(len(iso_df)):
-            if j >= i:
-                mask[i, j] = 0
+    if all(isinstance(array, PackedTriangle) for array in (intercept, nm, slope)):
+        enforce = [enforce_y_intercept_positive, enforce_pressure_increasing,
+                   enforce_absorbed_amount, enforce_relative_pressure,
+                   enforce_enough_datapoints]
+        return _rouq_mask_packed(intercept, iso_df, nm, slope, enforce, min_num_points)
 
     if enforce_y_intercept_positive is True:
         check1 = check_y_intercept_positive(intercept)
@@ -462,12 +1082,13 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
         check2 = np.ones((len(iso_df), len(iso_df)))
 
     if enforce_absorbed_amount is True:
-        check3 = check_absorbed_amount(iso_df, nm)
+        check3 = check_absorbed_amount(iso_df, nm, backend=backend)
     else:
         check3 = np.ones((len(iso_df), len(iso_df)))
 
     if enforce_relative_pressure is True:
-        check4 = check_pressure_consistency(iso_df, nm, slope, intercept)
+        check4 = check_pressure_consistency(iso_df, nm, slope, intercept,
+                                            backend=backend)
     else:
         check4 = np.ones((len(iso_df), len(iso_df)))
 
@@ -476,20 +1097,69 @@ def rouq_mask(intercept, iso_df, nm, slope, *args,
     else:
         check5 = np.ones((len(iso_df), len(iso_df)))
 
-    mask = np.multiply(check1, mask)
-    mask = np.multiply(check2, mask)
-    mask = np.multiply(check3, mask)
-    mask = np.multiply(check4, mask)
-    mask = np.multiply(check5, mask)
+    # ranges that were not analyzed by bet (nm = 0) are never valid
+    fitted = nm != 0
+
+    # inverted mask so that 0 = valid, 1 = invalid, to work well with numpy masks
+    invertedmask = _combine_checks(len(iso_df), fitted, check1, check2, check3,
+                                   check4, check5)
+
+    return RouqMask(invertedmask, check1, check2, check3, check4, check5, backend.name)
+
+
+def _rouq_mask_packed(intercept, iso_df, nm, slope, enforce, min_num_points):
+    """
+    ``rouq_mask`` of bet results stored as ``PackedTriangle`` objects, with
+    every check evaluated on the packed cells. enforce lists the enforce
+    flags of the five checks, in order.
+
+    """
+    num_points = len(iso_df)
+    n = np.asarray(iso_df.n, dtype=float)
+    relp = np.asarray(iso_df.relp, dtype=float)
+    i, j = _range_indices(num_points)
+    intercept, nm, slope = intercept.data, nm.data, slope.data
+    ones = np.ones(len(nm))
+
+    check1 = intercept > 0 if enforce[0] else ones
+    check2 = _points_increasing(relp, n)[i] if enforce[1] else ones
+    check3 = ((n[j] <= nm) & (nm <= n[i])).astype(float) if enforce[2] else ones
+    if enforce[3]:
+        check4 = np.zeros(len(nm))
+        cells = (nm != 0) & ~np.isnan(nm) & (j > 0)
+        check4[cells] = _pressure_consistency_ranges(n, relp, nm[cells], slope[cells],
+                                                     intercept[cells])
+    else:
+        check4 = ones
+    if enforce[4]:
+        check5 = _enough_datapoints(num_points, min_num_points, packed=True)
+    else:
+        check5 = ones
+
+    checks = [check1, check2, check3, check4, check5]
+    valid = nm != 0
+    for check in checks:
+        valid = valid & (check != 0)
+    checks = [PackedTriangle(check, num_points) for check in checks]
+    mask = PackedTriangle(~valid, num_points, fill=True)
+
+    return RouqMask(mask, *checks, "numpy")
 
-    mask = mask.astype(bool)  # converting mask to boolean
-    # inverting mask so that 0 = valid, 1 = invalid, to work well with numpy masks
-    invertedmask = np.logical_not(mask)
 
-    return RouqMask(invertedmask, check1, check2, check3, check4, check5)
+def _combine_checks(num_points, *checks):
+    """
+    Multiplies check arrays together and returns the inverted result as a
+    boolean mask, ie True where a relative pressure range is invalid. Only
+    ranges below the diagonal, where i > j, can be valid.
+
+    """
+    mask = np.tri(num_points, k=-1)
+    for check in checks:
+        mask = np.multiply(check, mask)
+    return np.logical_not(mask.astype(bool))
 
 
-def ssa_answer(bet_results, mask_results, criterion="error"):
+def ssa_answer(bet_results, mask_results, criterion="error", backend=None):
     """
     Logs a single specific surface area answer from the valid relative
     pressure range with the lowest error, most number of points, maximum
@@ -505,6 +1175,8 @@ def ssa_answer(bet_results, mask_results, criterion="error"):
     criterion : str
         Used to specify the criterion for a final specific surface area answer,
         either 'error', 'points', 'max', or 'min. Defaults to 'error'.
+    backend : str
+        Name of the compute backend, see ``bet``.
 
     Returns
     -------
@@ -512,7 +1184,13 @@ def ssa_answer(bet_results, mask_results, criterion="error"):
         Specific surface answer corresponding to user defined criteria.
 
     """
+    _require_ssa(bet_results)
+    answer = kernel(get_backend(backend), "ssa_answer")
+    return answer(bet_results, mask_results, criterion)
 
+
+def _ssa_answer(bet_results, mask_results, criterion):
+    """Finds the specific surface area answer, see ``ssa_answer``."""
     mask = mask_results.mask
 
     if mask.all():
@@ -568,6 +1246,504 @@ def ssa_answer(bet_results, mask_results, criterion="error"):
         raise ValueError("Invalid criterion, must be points, error, min, or max.")
 
 
+def ssa_answers(bet_results, mask_results, k=5,
+                criteria=("error", "points", "max", "min")):
+    """
+    Ranks the valid relative pressure ranges by the criteria of
+    ``ssa_answer``, and returns the best k ranges of each criterion.
+
+    The valid ranges are gathered once, the best k of each criterion are
+    selected with ``np.argpartition`` and only those are sorted. As in
+    ``ssa_answer``, ranges with an error of zero are not ranked by 'error'.
+
+    Unlike ``ssa_answer``, ties do not raise an error, they are broken
+    deterministically: ranges with the same number of points are ranked by
+    lowest error for 'points', and any remaining tie is broken by the
+    position of the range in the arrays of results, ie the range that ends
+    at the earlier data point, then begins at the earlier data point, ranks
+    first. The answer of a criterion was chosen by this rule when ranks 0
+    and 1 have the same 'err' ('error'), 'num_pts' ('points') or 'ssa'
+    ('max' and 'min').
+
+    Parameters
+    ----------
+    bet_results : namedtuple
+        Output of the bet function.
+    mask_results : namedtuple
+        Output of the rouq_mask function.
+    k : int
+        Number of ranges to return for each criterion.
+    criteria : sequence of str
+        Any of 'error', 'points', 'max' and 'min', see ``ssa_answer``.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by criterion and rank, rank 0 being the answer of the
+        criterion. Columns are the indices of the first and last data point
+        of the range, 'begin' and 'end', their relative pressures,
+        'begin_relp' and 'end_relp', and the 'num_pts', 'ssa', 'c' and 'err'
+        of the range.
+
+    Examples
+    --------
+    >>> ranked = ssa_answers(bet_results, mask_results)  # doctest: +SKIP
+    >>> ranked.xs(0, level="rank").ssa  # doctest: +SKIP
+
+    """
+    for criterion in criteria:
+        if criterion not in ("error", "points", "max", "min"):
+            raise ValueError("Invalid criterion, must be points, error, min, or max.")
+    _require_ssa(bet_results)
+    mask = np.asarray(mask_results.mask)
+    if mask.all():
+        msg = "No valid relative pressure ranges. Specific surface area not calculated."
+        raise ValueError(msg)
+
+    i, j = np.nonzero(~mask)
+    values = {field: np.asarray(getattr(bet_results, field), dtype=float)[i, j]
+              for field in ("num_pts", "ssa", "c", "err")}
+    # sort keys of each criterion, in order of priority, lowest first
+    keys = {
+        "error": (values["err"],),
+        "points": (-values["num_pts"], values["err"]),
+        "max": (-values["ssa"],),
+        "min": (values["ssa"],),
+    }
+
+    ranked = []
+    for criterion in criteria:
+        cells = np.arange(len(i))
+        if criterion == "error":
+            cells = cells[(values["err"] != 0) & ~np.isnan(values["err"])]
+        primary = keys[criterion][0][cells]
+        if len(cells) > k:
+            # the k best, plus any range tied with the k-th
+            threshold = primary[np.argpartition(primary, k - 1)[:k]].max()
+            cells = cells[primary <= threshold]
+        sort_keys = [key[cells] for key in keys[criterion]]
+        cells = cells[np.lexsort([cells] + sort_keys[::-1])][:k]
+        ranked.append(pd.DataFrame({
+            "criterion": criterion,
+            "rank": np.arange(len(cells)),
+            "begin": j[cells],
+            "end": i[cells],
+            "begin_relp": np.asarray(bet_results.iso_df.relp)[j[cells]],
+            "end_relp": np.asarray(bet_results.iso_df.relp)[i[cells]],
+            **{field: value[cells] for field, value in values.items()},
+        }))
+
+    return pd.concat(ranked, ignore_index=True).set_index(["criterion", "rank"])
+
+
+def pareto_front(bet_results, mask_results):
+    """
+    Returns the valid relative pressure ranges that are Pareto optimal for
+    low error, many data points and a specific surface area close to the
+    median of the valid ranges.
+
+    A range is on the front if no other valid range is at least as good in
+    all three objectives and better in one. Rather than comparing all pairs
+    of ranges, ranges are processed by number of points, from the most: the
+    ranges with the same number of points are sorted by error and compared
+    to the lowest deviation of those before them, and to a staircase of the
+    front of the ranges with more points, with ``np.searchsorted``. This is
+    O(M log M) for M valid ranges.
+
+    Parameters
+    ----------
+    bet_results : namedtuple
+        Output of the bet function.
+    mask_results : namedtuple
+        Output of the rouq_mask function.
+
+    Returns
+    -------
+    DataFrame
+        One row per range on the front, sorted by error, with the indices
+        of the first and last data point of the range, 'begin' and 'end',
+        their relative pressures, 'begin_relp' and 'end_relp', the
+        'num_pts', 'err', 'ssa' and 'c' of the range and the absolute
+        difference between its ssa and the median, 'ssa_deviation'.
+        Ranges with a nan error or ssa are not considered.
+
+    """
+    _require_ssa(bet_results)
+    mask = np.asarray(mask_results.mask)
+    i, j = np.nonzero(~mask)
+    values = {field: np.asarray(getattr(bet_results, field), dtype=float)[i, j]
+              for field in ("num_pts", "err", "ssa", "c")}
+    keep = ~np.isnan(values["err"]) & ~np.isnan(values["ssa"])
+    i, j = i[keep], j[keep]
+    values = {field: value[keep] for field, value in values.items()}
+    median = np.median(values["ssa"]) if len(i) else 0
+    values["ssa_deviation"] = abs(values["ssa"] - median)
+
+    front = _pareto_front(values["err"], values["num_pts"], values["ssa_deviation"])
+    order = np.lexsort((values["ssa_deviation"][front], values["err"][front]))
+    cells = np.nonzero(front)[0][order]
+    relp = np.asarray(bet_results.iso_df.relp)
+    return pd.DataFrame({
+        "begin": j[cells],
+        "end": i[cells],
+        "begin_relp": relp[j[cells]],
+        "end_relp": relp[i[cells]],
+        **{field: value[cells] for field, value in values.items()},
+    })
+
+
+def _pareto_front(err, num_pts, deviation):
+    """
+    Returns a boolean array, True for the points that are not dominated
+    when minimizing err and deviation and maximizing num_pts.
+
+    """
+    front = np.zeros(len(err), dtype=bool)
+    # staircase of the front of the levels processed so far, sorted by err,
+    # with the lowest deviation at or below each err, starting at -inf
+    stair_err = np.array([-np.inf])
+    stair_dev = np.array([np.inf])
+    # points sorted by level, most points first, then by err and deviation
+    order = np.lexsort((deviation, err, -num_pts))
+    starts = np.nonzero(np.diff(num_pts[order]))[0] + 1
+    for cells in np.split(order, starts):
+        e, d = err[cells], deviation[cells]
+
+        # dominated within the level, by a point before the first point
+        # identical to this one in err and deviation
+        new = np.ones(len(cells), dtype=bool)
+        new[1:] = (e[1:] != e[:-1]) | (d[1:] != d[:-1])
+        first = np.maximum.accumulate(np.where(new, np.arange(len(cells)), 0))
+        before = np.concatenate(([np.inf], np.minimum.accumulate(d)))[first]
+        dominated = before <= d
+
+        # dominated by a point with more data points
+        k = np.searchsorted(stair_err, e, side="right")
+        dominated |= stair_dev[k - 1] <= d
+        front[cells[~dominated]] = True
+
+        # add the front of this level to the staircase
+        stair_err = np.concatenate((stair_err, e[~dominated]))
+        stair_dev = np.concatenate((stair_dev, d[~dominated]))
+        order = np.lexsort((stair_dev, stair_err))
+        stair_err = stair_err[order]
+        stair_dev = np.minimum.accumulate(stair_dev[order])
+        steps = np.ones(len(stair_dev), dtype=bool)
+        steps[1:] = stair_dev[1:] < stair_dev[:-1]
+        stair_err, stair_dev = stair_err[steps], stair_dev[steps]
+
+    return front
+
+
+def min_points_sweep(bet_results, mask_results, min_num_points=None,
+                     criteria=("error", "points", "max", "min")):
+    """
+    Returns the specific surface area answer for many values of the minimum
+    number of points, check5, at once.
+
+    Check5 only depends on the number of points in a relative pressure
+    range, so the ranges that pass checks 1 to 4 are found once and sorted
+    by number of points. The answer for a minimum number of points p then
+    only depends on the ranges with at least p points, and is found for all
+    p at once from cumulative minima and maxima over the number of points.
+    Answers are the same as ``ssa_answer`` with
+    ``rouq_mask(..., min_num_points=p)``.
+
+    Parameters
+    ----------
+    bet_results : namedtuple
+        Output of the bet function.
+    mask_results : namedtuple
+        Output of the rouq_mask function, the checks enforced in it are
+        enforced in the sweep, check5 is replaced by each minimum number of
+        points.
+    min_num_points : array_like of int
+        Minimum numbers of points to evaluate, defaults to 2 up to the
+        number of data points.
+    criteria : sequence of str
+        Criteria for the answer, any of 'error', 'points', 'max' and 'min',
+        see ``ssa_answer``.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by minimum number of points, with the number of valid
+        relative pressure ranges in column 'num_valid' and the specific
+        surface area answer of each criterion in a column named after it.
+        Answers are nan where ``ssa_answer`` raises an error, ie no valid
+        ranges or several ranges tied for the answer.
+
+    """
+    for criterion in criteria:
+        if criterion not in ("error", "points", "max", "min"):
+            raise ValueError("Invalid criterion, must be points, error, min, or max.")
+    _require_ssa(bet_results)
+    ssa = np.asarray(bet_results.ssa, dtype=float)
+    err = np.asarray(bet_results.err, dtype=float)
+    num_points = len(ssa)
+    if min_num_points is None:
+        min_num_points = np.arange(2, num_points + 1)
+    min_num_points = np.asarray(min_num_points, dtype=int)
+
+    # ranges that pass checks 1 to 4, in row major order as in ssa_answer
+    fitted = np.asarray(bet_results.nm) != 0
+    checks = [np.asarray(check) for check in mask_results[1:5]]
+    i, j = np.nonzero(~_combine_checks(num_points, fitted, *checks))
+    length = i - j
+    ssa, err = ssa[i, j], err[i, j]
+
+    # ranges with a length, i - j, of at least min_num_points - 1 are valid,
+    # per-length results are accumulated from the longest ranges down
+    lowest = np.clip(min_num_points - 1, 0, num_points)
+    lengths = np.arange(num_points + 1)
+    counts = np.bincount(length, minlength=num_points + 1)
+    results = {"num_valid": _suffix(np.add, counts)[lowest]}
+
+    for criterion in criteria:
+        if criterion == "max":
+            per_length = np.full(num_points + 1, -np.inf)
+            np.maximum.at(per_length, length, ssa)
+            answer = _suffix(np.maximum, per_length)[lowest]
+        elif criterion == "min":
+            per_length = np.full(num_points + 1, np.inf)
+            np.minimum.at(per_length, length, ssa)
+            answer = _suffix(np.minimum, per_length)[lowest]
+        elif criterion == "points":
+            # the longest valid range, if it is the only one of its length
+            longest = length.max(initial=-1)
+            if longest >= 0 and counts[longest] == 1:
+                answer = np.where(lowest <= longest, ssa[length == longest][0], np.nan)
+            else:
+                answer = np.full(len(lowest), np.nan)
+        elif criterion == "error":
+            # zero errors are ignored, as in utils.max_min
+            keep = (err != 0) & ~np.isnan(err)
+            per_length = np.full(num_points + 1, np.inf)
+            np.minimum.at(per_length, length[keep], err[keep])
+            hits = keep & (err == per_length[length])
+            # ssa of the first range with the lowest error of each length
+            hit_lengths, first = np.unique(length[hits], return_index=True)
+            ssa_per_length = np.full(num_points + 1, np.nan)
+            ssa_per_length[hit_lengths] = ssa[hits][first]
+            hit_counts = np.bincount(length[hits], minlength=num_points + 1)
+            best = _suffix(np.minimum, per_length)[lowest]
+            tied = (per_length == best[:, None]) & (lengths >= lowest[:, None])
+            num_tied = (tied * hit_counts).sum(axis=1)
+            answer = np.where(num_tied == 1, ssa_per_length[tied.argmax(axis=1)], np.nan)
+        results[criterion] = np.where(results["num_valid"] > 0, answer, np.nan)
+
+    return pd.DataFrame(results, index=pd.Index(min_num_points, name="min_num_points"))
+
+
+def _suffix(ufunc, values):
+    """Accumulates ufunc over values from the end, ie suffix sums, minima."""
+    return ufunc.accumulate(values[::-1])[::-1]
+
+
+def _pressure_increasing(relp, n):
+    """
+    Check2 for isotherms stacked along the leading axes, see
+    ``check_pressure_increasing``.
+
+    """
+    test = _points_increasing(relp, n)
+    return np.repeat(test[..., :, None], n.shape[-1], axis=-1)
+
+
+def _points_increasing(relp, n):
+    """
+    Returns 1 for the data points where n(1 - relp) does not decrease from
+    the previous point, ie the rows of check2 that pass, else 0.
+
+    """
+    n_relp = n * (1 - relp)
+    first = np.zeros(n_relp.shape[:-1] + (1,))
+    minus1 = np.concatenate((first, n_relp[..., :-1]), axis=-1)
+    return (n_relp - minus1 >= 0).astype(float)
+
+
+def _absorbed_amount(n, nm):
+    """
+    Check3 for isotherms stacked along the leading axes, see
+    ``check_absorbed_amount``.
+
+    """
+    check3 = (n[..., None, :] <= nm) & (nm <= n[..., :, None])
+    return check3.astype(float)
+
+
+def _enough_datapoints(num_points, points, packed=False):
+    """
+    Check5 for an isotherm of num_points, see ``check_enough_datapoints``.
+    If packed is True only the cells below the diagonal are returned, in the
+    row-major order of ``PackedTriangle``.
+
+    """
+    if packed:
+        i, j = _range_indices(num_points)
+    else:
+        i, j = np.indices((num_points, num_points))
+    return (i - j >= points - 1).astype(float)
+
+
+def bet_batch(isotherms, relp=None, a_o=None, info=None,
+              enforce_y_intercept_positive=True,
+              enforce_pressure_increasing=True,
+              enforce_absorbed_amount=True,
+              enforce_relative_pressure=True,
+              enforce_enough_datapoints=True,
+              min_num_points=5,
+              backend=None):
+    """
+    Performs BET analysis and applies the Rouquerol criteria to many
+    isotherms at once.
+
+    Isotherms with the same number of data points are stacked and analyzed
+    together, the regressions, errors and most checks of all isotherms in a
+    stack are computed in one vectorized pass rather than one call to
+    ``bet`` and ``rouq_mask`` per isotherm.
+
+    Parameters
+    ----------
+    isotherms : ndarray or list of namedtuple
+        Either a 2D array of amount adsorbed values, in mol/g, with one row
+        per sample, or a list of ``isotherm_data`` named tuples output by a
+        data import function. Isotherms in the list can have different
+        numbers of data points.
+    relp : ndarray
+        Relative pressures, required if ``isotherms`` is an array. Either a
+        1D array shared by all samples or a 2D array with one row per
+        sample.
+    a_o : float
+        Cross sectional area of adsorbate, in square Angstrom, used if
+        ``isotherms`` is an array. Samples without an a_o, eg isotherms
+        imported without one, have a ``bet_results.ssa`` of None, as in
+        ``bet``.
+    info : str or list of str
+        Adsorbate-adsorbent information, used if ``isotherms`` is an array.
+    enforce_y_intercept_positive, enforce_pressure_increasing,
+    enforce_absorbed_amount, enforce_relative_pressure,
+    enforce_enough_datapoints, min_num_points
+        Same as in ``rouq_mask``.
+    backend : str
+        Name of the compute backend, see ``bet``. Kernels of the 'numpy'
+        backend analyze each stack of isotherms at once, kernels of other
+        backends are called once per isotherm.
+
+    Returns
+    -------
+    batch_results : namedtuple
+        Fields of the named tuple are:
+
+        - ``batch_results.bet_results`` (list) : ``bet_results`` named
+          tuple of each sample, same as returned by ``bet``.
+        - ``batch_results.mask_results`` (list) : ``rouq_mask`` named tuple
+          of each sample, same as returned by ``rouq_mask``.
+
+        Arrays of samples with the same number of data points, other than
+        ``ssa``, are views of one stacked array.
+
+    """
+    if relp is not None:
+        n = np.atleast_2d(np.asarray(isotherms, dtype=float))
+        relp = np.broadcast_to(np.asarray(relp, dtype=float), n.shape)
+        infos = info if isinstance(info, (list, tuple)) else [info] * len(n)
+        iso_dfs = [
+            pd.DataFrame({"relp": x, "n": y, "bet": (1 / y) * (x / (1 - x))})
+            for x, y in zip(relp, n)
+        ]
+        a_os = [a_o] * len(n)
+    else:
+        iso_dfs = [isotherm.iso_df for isotherm in isotherms]
+        a_os = [isotherm.a_o for isotherm in isotherms]
+        infos = [isotherm.info for isotherm in isotherms]
+
+    groups = {}
+    for k, iso_df in enumerate(iso_dfs):
+        groups.setdefault(len(iso_df), []).append(k)
+
+    backend = get_backend(backend)
+    regress_ranges = _stacked_kernel(backend, "regress_ranges")
+    fit_error = _stacked_kernel(backend, "fit_error")
+    absorbed_amount = _stacked_kernel(backend, "absorbed_amount")
+    pressure_consistency = _stacked_kernel(backend, "pressure_consistency")
+
+    bet_results = [None] * len(iso_dfs)
+    mask_results = [None] * len(iso_dfs)
+    for num_pts, samples in groups.items():
+        relp_s = np.stack([iso_dfs[k].relp.values for k in samples])
+        n_s = np.stack([iso_dfs[k].n.values for k in samples])
+        bet_s = np.stack([iso_dfs[k].bet.values for k in samples])
+        i, j = _range_indices(num_pts)
+
+        slope, intercept, r = regress_ranges(relp_s, bet_s, i, j)
+        c, nm = _bet_constants(slope, intercept)
+        err = fit_error(relp_s, bet_s, i, j, c, nm)
+
+        intercept = _to_dense(np.nan_to_num(intercept), i, j, num_pts)
+        nm = _to_dense(nm, i, j, num_pts)
+        slope = _to_dense(slope, i, j, num_pts)
+        c = _to_dense(c, i, j, num_pts)
+        err = _to_dense(err, i, j, num_pts)
+        r = _to_dense(r, i, j, num_pts)
+        number_pts = _to_dense(i - j + 1.0, i, j, num_pts)
+        number_pts = np.broadcast_to(number_pts, nm.shape)
+
+        ones = np.ones(nm.shape)
+        check1 = intercept > 0 if enforce_y_intercept_positive else ones
+        if enforce_pressure_increasing:
+            check2 = _pressure_increasing(relp_s, n_s)
+        else:
+            check2 = ones
+        check3 = absorbed_amount(n_s, nm) if enforce_absorbed_amount else ones
+        if enforce_relative_pressure:
+            check4 = pressure_consistency(n_s, relp_s, nm, slope, intercept, 0.1)
+        else:
+            check4 = ones
+        if enforce_enough_datapoints:
+            check5 = _enough_datapoints(num_pts, min_num_points)
+            check5 = np.broadcast_to(check5, nm.shape)
+        else:
+            check5 = ones
+        mask = _combine_checks(num_pts, nm != 0, check1, check2, check3, check4, check5)
+
+        for s, k in enumerate(samples):
+            bet_results[k] = BETResults(intercept[s], iso_dfs[k], nm[s], slope[s],
+                                        None, c[s], err[s], r[s], number_pts[s],
+                                        infos[k], backend.name)
+            if a_os[k] is not None:
+                bet_results[k] = with_adsorbate(bet_results[k], a_os[k])
+            mask_results[k] = RouqMask(mask[s], check1[s], check2[s], check3[s],
+                                       check4[s], check5[s], backend.name)
+
+    return BatchResults(bet_results, mask_results)
+
+
+def _stacked_kernel(backend, operation):
+    """
+    Returns the kernel of backend for operation, applied to isotherms with
+    the same number of data points stacked along the leading axis.
+
+    The 'numpy' kernels take the stacked arrays as they are. Kernels of other
+    backends are called once per isotherm, with the arguments that are
+    stacked, ie with more than one dimension, split along the leading axis.
+
+    """
+    func = kernel(backend, operation)
+    if func is kernel(get_backend("numpy"), operation):
+        return func
+
+    def stacked(*args):
+        num_sets = next(len(arg) for arg in args if np.ndim(arg) > 1)
+        results = [func(*(arg[s] if np.ndim(arg) > 1 else arg for arg in args))
+                   for s in range(num_sets)]
+        if isinstance(results[0], tuple):
+            return tuple(np.stack(values) for values in zip(*results))
+        return np.stack(results)
+
+    return stacked
+
+
 def run_beatmap(file=None,
                 info=None,
                 a_o=None,
@@ -581,7 +1757,10 @@ def run_beatmap(file=None,
                 export_data=False,
                 ssa_criterion="error",
                 ssa_gradient="Greens",
-                err_gradient="Greys"):
+                err_gradient="Greys",
+                cache=None,
+                archive=None,
+                store=None):
     """
     A single function that executes all necessary BEaTmap algorithims.
 
@@ -608,7 +1787,8 @@ def run_beatmap(file=None,
     info : str
         Adsorbate-adsorbent information.
     a_o : float
-        Cross sectional area of adsorbate, in square Angstrom.
+        Cross sectional area of adsorbate, in square Angstrom. Required, the
+        figures and results are based on the specific surface area.
     enforce_y_intercept_positive : bool
         If check1 is True any relative pressure ranges with a negative y
         intercept are considered invalid.
@@ -647,12 +1827,28 @@ def run_beatmap(file=None,
     err_gradient : str
         Color gradient for heatmap, must be a vaild color gradient name
         in the seaborn package, default is grey.
+    cache : ResultCache or str
+        If given, a ``beatmap.io.ResultCache``, or the directory of one,
+        where the results of the BET analysis and Rouquerol criteria are
+        stored, and read from when the same isotherm is analyzed again with
+        the same settings.
+    archive : ResultArchive or str
+        If given, a ``beatmap.io.ResultArchive``, or the directory of one,
+        the BET results and mask are appended to.
+    store : ResultStore or str
+        If given, a ``beatmap.io.ResultStore``, or the path of its database,
+        a summary of the results is inserted in.
 
     Returns
     -------
     None
 
     """
+    # the figures and results are all based on the specific surface area
+    if a_o is None:
+        raise ValueError("run_beatmap requires a_o, the cross sectional area of the "
+                         "adsorbate, to calculate the specific surface area.")
+
     # run_beatmap_import_data imports isotherm data from a .csv file and returns
     # the results in the isotherm_data namedtuple
     isotherm_data = io.import_data(file, info, a_o)
@@ -662,22 +1858,33 @@ def run_beatmap(file=None,
     # bet_results uses isotherm_data, applies BET analysis and returns the results
     # in the bet_results namedtuple
 
-    bet_results = bet(isotherm_data.iso_df, isotherm_data.a_o, isotherm_data.info)
-
     # mask_results uses isotherm_data and bet_results, applies the roquerol
     # criteria specified by the user, and returns the results in the
     # mask_results named tuple
 
-    mask_results = rouq_mask(bet_results.intercept,
-                             bet_results.iso_df,
-                             bet_results.nm,
-                             bet_results.slope,
-                             enforce_y_intercept_positive=enforce_y_intercept_positive,
-                             enforce_pressure_increasing=enforce_pressure_increasing,
-                             enforce_absorbed_amount=enforce_absorbed_amount,
-                             enforce_relative_pressure=enforce_relative_pressure,
-                             enforce_enough_datapoints=enforce_enough_datapoints,
-                             min_num_points=min_num_points)
+    mask_kwargs = dict(enforce_y_intercept_positive=enforce_y_intercept_positive,
+                       enforce_pressure_increasing=enforce_pressure_increasing,
+                       enforce_absorbed_amount=enforce_absorbed_amount,
+                       enforce_relative_pressure=enforce_relative_pressure,
+                       enforce_enough_datapoints=enforce_enough_datapoints,
+                       min_num_points=min_num_points)
+
+    if cache is not None:
+        bet_results, mask_results = _result_cache(cache).analyze(*isotherm_data,
+                                                                 **mask_kwargs)
+    else:
+        bet_results = bet(isotherm_data.iso_df, isotherm_data.a_o, isotherm_data.info)
+        mask_results = rouq_mask(bet_results.intercept,
+                                 bet_results.iso_df,
+                                 bet_results.nm,
+                                 bet_results.slope,
+                                 **mask_kwargs)
+
+    if archive is not None:
+        _result_archive(archive).append(bet_results, mask_results, file=file)
+    if store is not None:
+        with _result_store(store) as result_store:
+            result_store.insert(bet_results, mask_results, file=file)
 
     # mask_results are used to highlight the valid bet_results in the
     # following functions
@@ -710,3 +1917,203 @@ def run_beatmap(file=None,
                            bet_results.num_pts)
 
     return results
+
+
+def _result_cache(cache):
+    """Returns cache as a ``ResultCache``, creating one if it is a directory."""
+    return cache if isinstance(cache, io.ResultCache) else io.ResultCache(cache)
+
+
+def _result_archive(archive):
+    """Returns archive as a ``ResultArchive``, opening one if it is a directory."""
+    return archive if isinstance(archive, io.ResultArchive) else io.ResultArchive(archive)
+
+
+@contextlib.contextmanager
+def _result_store(store):
+    """
+    Yields store as a ``ResultStore``, opening one if it is a path, which is
+    closed on exit. Stores that are passed in are left open.
+
+    """
+    if isinstance(store, io.ResultStore):
+        yield store
+    else:
+        with io.ResultStore(store) as opened:
+            yield opened
+
+
+def _analyze_file(file, a_o, info, mask_kwargs, ssa_criterion, cache=None,
+                  keep_results=False):
+    """
+    Analyzes one isotherm file for ``run_beatmap_batch``, returns a row of the
+    summary table. Errors are recorded in the row rather than raised.
+
+    If keep_results is True the ``bet`` and ``rouq_mask`` results are
+    returned with the row, or None if they could not be computed.
+
+    """
+    results = None
+    row = {"file": str(file), "info": info, "ssa": np.nan, "c": np.nan,
+           "nm": np.nan, "begin_relp": np.nan, "end_relp": np.nan,
+           "num_valid": 0, "valid": False, "error": None}
+    try:
+        isotherm_data = io.import_data(file, info, a_o)
+        if cache is not None:
+            bet_results, mask_results = _result_cache(cache).analyze(*isotherm_data,
+                                                                     **mask_kwargs)
+        else:
+            bet_results = bet(*isotherm_data)
+            mask_results = rouq_mask(*bet_results, **mask_kwargs)
+        results = BatchResults(bet_results, mask_results)
+        row["num_valid"] = int((~mask_results.mask).sum())
+        ssa_ans = ssa_answer(bet_results, mask_results, ssa_criterion)
+        # range of the answer, found by index rather than by its ssa value
+        best = ssa_answers(bet_results, mask_results, k=1, criteria=(ssa_criterion,))
+        best = best.iloc[0]
+        i, j = int(best.end), int(best.begin)
+        row.update(ssa=float(ssa_ans),
+                   c=float(best.c),
+                   nm=float(bet_results.nm[i, j]),
+                   begin_relp=float(best.begin_relp),
+                   end_relp=float(best.end_relp),
+                   valid=True)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    if keep_results:
+        return row, results
+    return row
+
+
+def run_beatmap_batch(files,
+                      a_o,
+                      info=None,
+                      n_workers=None,
+                      enforce_y_intercept_positive=True,
+                      enforce_pressure_increasing=True,
+                      enforce_absorbed_amount=True,
+                      enforce_relative_pressure=True,
+                      enforce_enough_datapoints=True,
+                      min_num_points=5,
+                      ssa_criterion="error",
+                      cache=None,
+                      archive=None,
+                      store=None):
+    """
+    Runs BEaTmap on many isotherm files in parallel and summarizes the results.
+
+    Files are analyzed in separate processes, the import, BET analysis,
+    Rouquerol criteria and specific surface area answer are the same as in
+    ``run_beatmap`` but no figures are made and no data is exported. A file
+    that can not be analyzed does not stop the run, its error message is
+    recorded in the summary instead.
+
+    Parameters
+    ----------
+    files : str or list
+        List of file names/paths, or a glob pattern, eg ``"data/*.csv"``.
+    a_o : float
+        Cross sectional area of adsorbate, in square Angstrom, used for all
+        files.
+    info : str or list of str
+        Adsorbate-adsorbent information, either one string for all files or
+        one per file. Defaults to the file names.
+    n_workers : int
+        Number of worker processes, defaults to the number of CPUs.
+    enforce_y_intercept_positive, enforce_pressure_increasing,
+    enforce_absorbed_amount, enforce_relative_pressure,
+    enforce_enough_datapoints, min_num_points, ssa_criterion, cache
+        Same as in ``run_beatmap``. The worker processes share the cache.
+    archive : ResultArchive or str
+        If given, a ``beatmap.io.ResultArchive``, or the directory of one,
+        the results of every file that could be analyzed are appended to, in
+        the order of ``files``.
+    store : ResultStore or str
+        If given, a ``beatmap.io.ResultStore``, or the path of its database,
+        the summaries of the files that could be analyzed are inserted in,
+        in one transaction.
+
+    Returns
+    -------
+    summary : DataFrame
+        One row per file, in the order of ``files``, with columns ``file``,
+        ``info``, ``ssa`` (m^2/g), ``c``, ``nm`` (mol/g), ``begin_relp`` and
+        ``end_relp`` (the relative pressure range the answer comes from),
+        ``num_valid`` (the number of valid relative pressure ranges),
+        ``valid`` (False if no answer was found) and ``error`` (the error
+        message if the analysis failed, else None). With an archive, the
+        column ``archive_index`` has the index of each file in the archive,
+        or -1 if its results were not archived. With a store, the column
+        ``store_id`` has the id of the row of each file in the store, or -1.
+
+    """
+    if isinstance(files, (str, os.PathLike)):
+        files = sorted(glob.glob(str(files)))
+    files = list(files)
+    if not isinstance(info, (list, tuple)):
+        info = [info if info is not None else os.path.basename(str(f)) for f in files]
+
+    mask_kwargs = dict(enforce_y_intercept_positive=enforce_y_intercept_positive,
+                       enforce_pressure_increasing=enforce_pressure_increasing,
+                       enforce_absorbed_amount=enforce_absorbed_amount,
+                       enforce_relative_pressure=enforce_relative_pressure,
+                       enforce_enough_datapoints=enforce_enough_datapoints,
+                       min_num_points=min_num_points)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        rows = list(executor.map(_analyze_file,
+                                 files,
+                                 [a_o] * len(files),
+                                 info,
+                                 [mask_kwargs] * len(files),
+                                 [ssa_criterion] * len(files),
+                                 [cache] * len(files),
+                                 [archive is not None or store is not None]
+                                 * len(files)))
+
+    columns = ["file", "info", "ssa", "c", "nm", "begin_relp", "end_relp",
+               "num_valid", "valid", "error"]
+    if archive is not None or store is not None:
+        # results are written by this process only, in order
+        rows, results = zip(*rows) if rows else ([], [])
+        done = [k for k, result in enumerate(results) if result is not None]
+        done_results = [[results[k].bet_results for k in done],
+                        [results[k].mask_results for k in done],
+                        [files[k] for k in done]]
+        with contextlib.ExitStack() as stack:
+            outputs = []
+            if archive is not None:
+                outputs.append(("archive_index", _result_archive(archive).extend))
+            if store is not None:
+                result_store = stack.enter_context(_result_store(store))
+                outputs.append(("store_id", result_store.insert_many))
+            for column, write in outputs:
+                for row in rows:
+                    row[column] = -1
+                for k, index in zip(done, write(*done_results)):
+                    rows[k][column] = index
+                columns.append(column)
+
+    summary = pd.DataFrame(rows, columns=columns)
+    return summary
+
+
+register_backend("reference",
+                 regress_ranges=_regress_ranges_loop,
+                 fit_error=_fit_error_loop,
+                 absorbed_amount=_absorbed_amount_loop,
+                 pressure_consistency=_pressure_consistency_loop,
+                 single_point=_single_point_loop,
+                 ssa_answer=_ssa_answer)
+register_backend("numpy",
+                 regress_ranges=_regress_ranges,
+                 fit_error=_fit_error,
+                 absorbed_amount=_absorbed_amount,
+                 pressure_consistency=_pressure_consistency,
+                 single_point=_single_point,
+                 ssa_answer=_ssa_answer)
+register_backend("threaded",
+                 fit_error=_fit_error_threaded)
+register_backend("numba",
+                 available=_numba.HAS_NUMBA,
+                 loader=_numba.load)
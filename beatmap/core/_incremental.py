@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+from . import _bet
+from ._packed import PackedTriangle
+
+__all__ = [
+    "IncrementalBET",
+]
+
+# quantities stored for every relative pressure range, in packed row-major order
+_RANGE_FIELDS = ("intercept", "nm", "slope", "c", "err", "r", "num_pts",
+                 "check1", "check3", "check4")
+
+
+class IncrementalBET:
+    """
+    BET analysis of an isotherm that is updated as data points are acquired.
+
+    Appending the i-th data point only adds the relative pressure ranges
+    that end at that point, ie row i of the ``bet_results`` arrays, to the
+    existing results. The sums needed for the regressions are kept as running
+    sums so the slope, intercept, r, C and nm of the new row cost O(N). The
+    fit error of a range depends on every point in the range, so the error
+    of the new row is O(N^2), computed in one vectorized pass. The results
+    of the Rouquerol checks are updated along with the row, check4 is also
+    re-evaluated for the earlier ranges whose nm falls beyond the previous
+    data, as the new point changes the interpolated relative pressure of
+    those ranges only. The specific surface area is computed from nm when
+    the results are returned, see ``with_adsorbate``.
+
+    Results agree with those of ``bet`` and ``rouq_mask`` on the complete
+    isotherm to within round-off.
+
+    Parameters
+    ----------
+    a_o : float
+        Cross sectional area of adsorbate, in square Angstrom. If None, the
+        specific surface area is not calculated, as in ``bet``.
+    info : str
+        Adsorbate-adsorbent information.
+
+    Examples
+    --------
+    >>> analyzer = IncrementalBET(a_o=16.2, info="N2 on carbon")
+    >>> for relp, n in acquisition:  # doctest: +SKIP
+    ...     analyzer.append(relp, n)
+    ...     mask_results = analyzer.rouq_mask()
+
+    """
+
+    def __init__(self, a_o, info=None):
+        self.a_o = a_o
+        self.info = info
+        self._num_points = 0
+        self._points = np.zeros((5, 0))  # relp, n, bet, n(1-relp), check2
+        self._sums = np.zeros((5, 1))
+        self._shift = (0.0, 0.0)
+        self._ranges = {field: np.zeros(0) for field in _RANGE_FIELDS}
+
+    def __len__(self):
+        return self._num_points
+
+    @property
+    def relp(self):
+        return self._points[0, :self._num_points]
+
+    @property
+    def n(self):
+        return self._points[1, :self._num_points]
+
+    def _reserve(self, num_points):
+        # grow storage geometrically so appending is amortized O(N)
+        capacity = self._points.shape[1]
+        if num_points <= capacity:
+            return
+        capacity = max(num_points, 2 * capacity, 16)
+        points = np.zeros((5, capacity))
+        points[:, :self._num_points] = self._points[:, :self._num_points]
+        self._points = points
+        sums = np.zeros((5, capacity + 1))
+        sums[:, :self._num_points + 1] = self._sums[:, :self._num_points + 1]
+        self._sums = sums
+        num_ranges = self._num_points * (self._num_points - 1) // 2
+        for field, values in self._ranges.items():
+            grown = np.zeros(capacity * (capacity - 1) // 2)
+            grown[:num_ranges] = values[:num_ranges]
+            self._ranges[field] = grown
+
+    def append(self, relp, n):
+        """
+        Adds a data point to the isotherm and analyzes the relative pressure
+        ranges that end at it.
+
+        Parameters
+        ----------
+        relp : float
+            Relative pressure of the data point.
+        n : float
+            Amount adsorbed, in mol/g.
+
+        """
+        if n == 0:
+            raise ValueError("Cannot have n = 0 values in dataframe.")
+        i = self._num_points
+        self._reserve(i + 1)
+
+        bet_val = (1 / n) * (relp / (1 - relp))
+        n_relp = n * (1 - relp)
+        previous = self._points[3, i - 1] if i > 0 else 0
+        self._points[:, i] = relp, n, bet_val, n_relp, n_relp - previous >= 0
+
+        if i == 0:
+            self._shift = (relp, bet_val)
+        x0, y0 = relp - self._shift[0], bet_val - self._shift[1]
+        self._sums[:, i + 1] = self._sums[:, i] + (x0, y0, x0 * x0, y0 * y0, x0 * y0)
+        self._num_points = i + 1
+        if i == 0:
+            return
+
+        rows = slice(i * (i - 1) // 2, i * (i + 1) // 2)
+        ii = np.full(i, i)
+        jj = np.arange(i)
+        relp_all, n_all, bet_all = self._points[:3, :i + 1]
+        round_off = (i + 1) * np.finfo(float).eps * np.abs(bet_all).max()
+        slope, intercept, r = _bet._regress_sums(self._sums[:, :i + 2], ii, jj,
+                                                 self._shift[0], self._shift[1],
+                                                 round_off)
+        c, nm = _bet._bet_constants(slope, intercept)
+
+        new = self._ranges
+        new["intercept"][rows] = np.nan_to_num(intercept)
+        new["nm"][rows] = nm
+        new["slope"][rows] = slope
+        new["c"][rows] = c
+        new["err"][rows] = _bet._fit_error(relp_all, bet_all, ii, jj, c, nm)
+        new["r"][rows] = r
+        new["num_pts"][rows] = i - jj + 1.0
+        new["check1"][rows] = new["intercept"][rows] > 0
+        new["check3"][rows] = (n_all[jj] <= nm) & (nm <= n)
+
+        # check4: new row, plus earlier ranges whose nm was extrapolated or
+        # is beyond the new point, as the interpolated relp of these changes
+        offset = rows.start
+        earlier_nm = new["nm"][:offset]
+        threshold = min(n, n_all[:i].max())
+        redo = np.nonzero((earlier_nm >= threshold) | np.isnan(earlier_nm))[0]
+        cells = np.concatenate((redo, np.arange(offset, rows.stop)))
+        ci, cj = _packed_indices(cells)
+        new["check4"][cells] = 0
+        nm_cells = new["nm"][cells]
+        cells = cells[(nm_cells != 0) & ~np.isnan(nm_cells) & (ci > 0) & (cj > 0)]
+        new["check4"][cells] = _bet._pressure_consistency_ranges(
+            n_all, relp_all, new["nm"][cells], new["slope"][cells],
+            new["intercept"][cells])
+
+    def extend(self, relp, n):
+        """Appends several data points, see ``append``."""
+        for x, y in zip(relp, n):
+            self.append(x, y)
+
+    def _packed(self, field):
+        num_ranges = self._num_points * (self._num_points - 1) // 2
+        return PackedTriangle(self._ranges[field][:num_ranges].copy(), self._num_points)
+
+    def bet_results(self, packed=False):
+        """
+        Returns the results of BET analysis of the data points so far, in
+        the same ``bet_results`` named tuple as ``bet``.
+
+        Parameters
+        ----------
+        packed : bool
+            If True the arrays are returned as ``PackedTriangle`` objects.
+
+        """
+        iso_df = pd.DataFrame({"relp": self.relp, "n": self.n,
+                               "bet": self._points[2, :self._num_points]})
+        arrays = {}
+        for field in ("intercept", "nm", "slope", "c", "err", "r", "num_pts"):
+            arrays[field] = self._packed(field)
+            if not packed:
+                arrays[field] = arrays[field].toarray()
+        results = _bet.BETResults(iso_df=iso_df, ssa=None, info=self.info,
+                                  backend="numpy", **arrays)
+        if self.a_o is not None:
+            results = _bet.with_adsorbate(results, self.a_o)
+        return results
+
+    def rouq_mask(self,
+                  enforce_y_intercept_positive=True,
+                  enforce_pressure_increasing=True,
+                  enforce_absorbed_amount=True,
+                  enforce_relative_pressure=True,
+                  enforce_enough_datapoints=True,
+                  min_num_points=5):
+        """
+        Returns the Rouquerol criteria of the data points so far, in the same
+        ``rouq_mask`` named tuple as ``rouq_mask``. Parameters are the same
+        as in ``rouq_mask``.
+
+        """
+        size = self._num_points
+        ones = np.ones((size, size))
+        check1 = self._packed("check1").toarray().astype(bool)
+        check2 = np.repeat(self._points[4, :size, None], size, axis=1)
+        check3 = self._packed("check3").toarray()
+        check4 = self._packed("check4").toarray()
+        check5 = _bet._enough_datapoints(size, min_num_points)
+
+        check1 = check1 if enforce_y_intercept_positive else ones
+        check2 = check2 if enforce_pressure_increasing else ones
+        check3 = check3 if enforce_absorbed_amount else ones
+        check4 = check4 if enforce_relative_pressure else ones
+        check5 = check5 if enforce_enough_datapoints else ones
+        fitted = self._packed("nm").toarray() != 0
+        mask = _bet._combine_checks(size, fitted, check1, check2, check3, check4, check5)
+
+        return _bet.RouqMask(mask, check1, check2, check3, check4, check5, "numpy")
+
+
+def _packed_indices(cells):
+    """Returns the (i, j) indices of cells of a packed triangle."""
+    i = ((1 + np.sqrt(1 + 8 * cells)) // 2).astype(int)
+    # correct for round-off in the square root
+    i -= i * (i - 1) // 2 > cells
+    i += (i + 1) * i // 2 <= cells
+    return i, cells - i * (i - 1) // 2
@@ -0,0 +1,115 @@
+import numpy as np
+
+from . import _bet
+from ._backends import get_backend
+
+__all__ = [
+    "RouqMaskCache",
+]
+
+
+class RouqMaskCache:
+    """
+    Rouquerol criteria of one set of BET results, computed once and combined
+    on demand.
+
+    ``rouq_mask`` computes every enabled check each time it is called. When
+    the same results are masked with different settings, eg as checks are
+    toggled in the app, a ``RouqMaskCache`` computes checks 1 to 4 once and
+    stores each as a bit-packed boolean array, 1/8 of a byte per relative
+    pressure range. ``rouq_mask`` then only combines the packed arrays of
+    the enabled checks with bitwise and, check5 is generated for each
+    ``min_num_points`` value used and cached as well.
+
+    Rather than pass individual parameters, the cache can be created from
+    ``bet_results`` (where ``bet_results`` is a named tuple output by the bet
+    function).
+
+    Parameters
+    ----------
+    intercept : array
+        2D array of intercept values, used in check1.
+    iso_df : dataframe
+        Dataframe of imported experimental isothermal adsorption data.
+    nm : array
+        2D array of BET specific amount of adsorbate in the monolayer.
+    slope : array
+        2D array of slope values.
+    backend : str
+        Name of the compute backend used for the checks, see ``bet``.
+
+    Examples
+    --------
+    >>> cache = RouqMaskCache(*bet_results)  # doctest: +SKIP
+    >>> mask_results = cache.rouq_mask(enforce_relative_pressure=False)  # doctest: +SKIP
+
+    """
+
+    def __init__(self, intercept, iso_df, nm, slope, *args, backend=None):
+        self.backend = get_backend(backend).name
+        self.num_points = len(iso_df)
+        checks = [
+            _bet.check_y_intercept_positive(intercept),
+            _bet.check_pressure_increasing(iso_df),
+            _bet.check_absorbed_amount(iso_df, nm, backend=self.backend),
+            _bet.check_pressure_consistency(iso_df, nm, slope, intercept,
+                                            backend=self.backend),
+        ]
+        self._dtypes = [check.dtype for check in checks]
+        self._checks = [self._pack(check) for check in checks]
+        # only ranges below the diagonal that were analyzed can be valid
+        self._fitted = self._pack(np.tri(self.num_points, k=-1, dtype=bool)
+                                  & (np.asarray(nm) != 0))
+        self._enough_datapoints = {}
+
+    @property
+    def nbytes(self):
+        """Memory used by the cached checks, in bytes."""
+        packed = self._checks + [self._fitted] + list(self._enough_datapoints.values())
+        return sum(check.nbytes for check in packed)
+
+    def _pack(self, check):
+        return np.packbits(np.asarray(check) != 0, axis=None)
+
+    def _unpack(self, packed, dtype=bool):
+        size = self.num_points
+        return np.unpackbits(packed, count=size * size).reshape(size, size).astype(dtype)
+
+    def _check5(self, min_num_points):
+        if min_num_points not in self._enough_datapoints:
+            check5 = _bet._enough_datapoints(self.num_points, min_num_points)
+            self._enough_datapoints[min_num_points] = self._pack(check5)
+        return self._enough_datapoints[min_num_points]
+
+    def rouq_mask(self,
+                  enforce_y_intercept_positive=True,
+                  enforce_pressure_increasing=True,
+                  enforce_absorbed_amount=True,
+                  enforce_relative_pressure=True,
+                  enforce_enough_datapoints=True,
+                  min_num_points=5):
+        """
+        Returns the combined mask for the enabled checks, in the same
+        ``rouq_mask`` named tuple, with the same values, as ``rouq_mask``.
+        Parameters are the same as in ``rouq_mask``.
+
+        """
+        enforce = [enforce_y_intercept_positive, enforce_pressure_increasing,
+                   enforce_absorbed_amount, enforce_relative_pressure]
+        valid = self._fitted.copy()
+        for packed, enforced in zip(self._checks, enforce):
+            if enforced:
+                valid &= packed
+        if enforce_enough_datapoints:
+            valid &= self._check5(min_num_points)
+
+        ones = np.ones((self.num_points, self.num_points))
+        checks = [self._unpack(packed, dtype) if enforced else ones
+                  for packed, dtype, enforced in zip(self._checks, self._dtypes, enforce)]
+        if enforce_enough_datapoints:
+            checks.append(self._unpack(self._check5(min_num_points), float))
+        else:
+            checks.append(ones)
+        mask = self._unpack(valid) == 0
+
+        return _bet.RouqMask(mask, *checks, self.backend)
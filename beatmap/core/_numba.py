@@ -0,0 +1,167 @@
+"""
+Numba compiled versions of the hot loops of BET analysis.
+
+Numba is an optional dependency, ``HAS_NUMBA`` is False when it is not
+installed. Numba is only imported, and the kernels below compiled, by
+``load`` the first time the 'numba' backend is selected, so importing
+BEaTmap does not pay for it. The kernels work on the arrays of one isotherm
+and give the same results as the NumPy implementations in ``_bet`` up to
+floating point round-off.
+
+Compiled kernels are cached on disk, by default in the ``__pycache__``
+directory next to this file, or a user-wide directory if the package
+directory is not writable (see the ``NUMBA_CACHE_DIR`` environment variable
+of Numba to choose another location). Set the ``BEATMAP_NUMBA_CACHE``
+environment variable to 0 to compile the kernels in every session instead.
+
+"""
+import importlib.util
+import os
+
+import numpy as np
+
+__all__ = []
+
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+_EPS = np.finfo(np.float64).eps
+_MAX = np.finfo(np.float64).max
+
+
+def load():
+    """
+    Imports Numba and returns the compiled kernels, keyed by operation, see
+    ``register_backend``.
+
+    """
+    import numba
+
+    cache = os.environ.get("BEATMAP_NUMBA_CACHE", "1") != "0"
+    # error_model="numpy" so that division by zero gives inf/nan as in NumPy
+    jit = numba.njit(cache=cache, error_model="numpy")
+    return {
+        "regress_ranges": jit(regress_ranges),
+        "fit_error": jit(fit_error),
+        "absorbed_amount": jit(absorbed_amount),
+        "pressure_consistency": jit(pressure_consistency),
+    }
+
+
+def regress_ranges(x, y, i, j):
+    """Same as ``_bet._regress_ranges`` for one isotherm."""
+    num_points = x.shape[0]
+    x_shift = x.mean()
+    y_shift = y.mean()
+    sums = np.zeros((5, num_points + 1))
+    for k in range(num_points):
+        x0 = x[k] - x_shift
+        y0 = y[k] - y_shift
+        sums[0, k + 1] = sums[0, k] + x0
+        sums[1, k + 1] = sums[1, k] + y0
+        sums[2, k + 1] = sums[2, k] + x0 * x0
+        sums[3, k + 1] = sums[3, k] + y0 * y0
+        sums[4, k + 1] = sums[4, k] + x0 * y0
+    round_off = num_points * _EPS * np.abs(y).max()
+
+    slope = np.empty(i.shape[0])
+    intercept = np.empty(i.shape[0])
+    r = np.empty(i.shape[0])
+    for k in range(i.shape[0]):
+        n = i[k] - j[k] + 1
+        sx = sums[0, i[k] + 1] - sums[0, j[k]]
+        sy = sums[1, i[k] + 1] - sums[1, j[k]]
+        sxx = sums[2, i[k] + 1] - sums[2, j[k]]
+        syy = sums[3, i[k] + 1] - sums[3, j[k]]
+        sxy = sums[4, i[k] + 1] - sums[4, j[k]]
+        x_mean = sx / n
+        y_mean = sy / n
+        ssxm = max(sxx - sx * x_mean, 0.0)
+        ssym = max(syy - sy * y_mean, 0.0)
+        ssxym = sxy - sx * y_mean
+
+        slope[k] = ssxym / ssxm
+        r_den = np.sqrt(ssxm * ssym)
+        r[k] = 0.0 if r_den == 0 else min(max(ssxym / r_den, -1.0), 1.0)
+        b = (y_mean + y_shift) - slope[k] * (x_mean + x_shift)
+        intercept[k] = 0.0 if abs(b) <= round_off else b
+
+    return slope, intercept, r
+
+
+def fit_error(relp, bet_vals, i, j, c, nm):
+    """Same as ``_bet._fit_error`` for one isotherm."""
+    err = np.zeros(i.shape[0])
+    for k in range(i.shape[0]):
+        if i[k] - j[k] == 1:
+            continue
+        total = 0.0
+        for p in range(j[k], i[k] + 1):
+            if nm[k] != 0:
+                bet_c = (1 / (nm[k] * c[k])) + (c[k] - 1) * relp[p] / (nm[k] * c[k])
+            else:
+                bet_c = 0.0
+            error = abs(bet_c - bet_vals[p]) / bet_c
+            # same as np.nan_to_num
+            if np.isnan(error):
+                error = 0.0
+            elif np.isinf(error):
+                error = _MAX if error > 0 else -_MAX
+            total += error
+        err[k] = 100 * total / (i[k] + 1 - j[k])
+    return err
+
+
+def absorbed_amount(n, nm):
+    """Same as ``check_absorbed_amount``, given n as an array."""
+    size = nm.shape[0]
+    check3 = np.zeros((size, size))
+    for i in range(size):
+        for j in range(size):
+            if n[j] <= nm[i, j] <= n[i]:
+                check3[i, j] = 1
+    return check3
+
+
+def pressure_consistency(n, relp, nm, slope, intercept, tolerance):
+    """Same as ``check_pressure_consistency``, given n and relp as arrays."""
+    size = nm.shape[0]
+    check4 = np.zeros((size, size))
+    n_sorted = np.sort(n)
+    for i in range(1, size):
+        for j in range(1, size):
+            val = nm[i, j]
+            if val == 0 or np.isnan(val):
+                continue
+            # relp corresponding to nm, as in utils.lin_interp
+            hindex = np.searchsorted(n_sorted, val, side="right")
+            if hindex == size:
+                hindex = hindex - 1
+            lindex = hindex - 1
+            if hindex == 0:
+                lindex = 0
+                m = 0.0
+            else:
+                m = (relp[hindex] - relp[lindex]) / (n[hindex] - n[lindex])
+            b = relp[hindex] - n[hindex] * m
+            relpm = m * val + b
+
+            # roots of the BET equation solved for relp, a quadratic
+            qa = -1 * slope[i, j] * val
+            qb = slope[i, j] * val - 1 - intercept[i, j] * val
+            qc = intercept[i, j] * val
+            if qa == 0:
+                continue
+            disc = qb * qb - 4 * qa * qc
+            if disc < 0:
+                # complex roots, only the real part is used
+                root_1 = root_2 = -qb / (2 * qa)
+            else:
+                q = -0.5 * (qb + np.copysign(np.sqrt(disc), qb))
+                root_1 = q / qa
+                root_2 = qc / q if q != 0 else 0.0
+            diff_1 = abs((root_1 - relpm) / relpm)
+            diff_2 = abs((root_2 - relpm) / relpm)
+            diff = diff_2 if diff_2 < diff_1 else diff_1
+            if diff < tolerance:
+                check4[i, j] = 1
+    return check4
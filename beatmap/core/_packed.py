@@ -0,0 +1,106 @@
+import numpy as np
+
+__all__ = [
+    "PackedTriangle",
+]
+
+
+class PackedTriangle(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Square array of BET results where only the cells below the diagonal are
+    stored.
+
+    Results of BET analysis only exist for relative pressure ranges where
+    the index of the last data point, i, is greater than the index of the
+    first, j. A ``PackedTriangle`` stores these cells in one contiguous
+    buffer, in row-major order, which takes less than half the memory of the
+    equivalent 2D array.
+
+    Single cells can be read with ``packed[i, j]``, cells on or above the
+    diagonal are ``fill``. Everything else (slicing, arithmetic, numpy functions,
+    array methods) operates on a dense 2D copy of the array that is created
+    on demand, so a ``PackedTriangle`` can be passed to functions that expect
+    the 2D arrays of ``bet_results``.
+
+    Parameters
+    ----------
+    data : array_like
+        Values of the cells below the diagonal, in row-major order, ie the
+        value of cell (i, j) is ``data[i * (i - 1) // 2 + j]``.
+    num_points : int
+        Number of data points in the isotherm, ie the size of the square
+        array.
+    fill : scalar
+        Value of the cells on or above the diagonal, default 0. Masks of
+        ``rouq_mask`` are packed with a fill of True, ranges that do not
+        exist are invalid.
+
+    """
+
+    def __init__(self, data, num_points, fill=0):
+        data = np.asarray(data)
+        if data.shape != (num_points * (num_points - 1) // 2,):
+            raise ValueError("data must have one value per cell below the diagonal.")
+        self.data = data
+        self.num_points = num_points
+        self.fill = fill
+
+    @classmethod
+    def from_dense(cls, array):
+        """Packs the cells below the diagonal of a square 2D array."""
+        array = np.asarray(array)
+        i, j = np.tril_indices(len(array), -1)
+        return cls(array[i, j], len(array))
+
+    @property
+    def shape(self):
+        return (self.num_points, self.num_points)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def toarray(self):
+        """Returns the dense 2D array, cells on or above the diagonal are fill."""
+        dense = np.full(self.shape, self.fill, dtype=self.dtype)
+        dense[np.tril_indices(self.num_points, -1)] = self.data
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.toarray()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [x.toarray() if isinstance(x, PackedTriangle) else x for x in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, key):
+        if (isinstance(key, tuple) and len(key) == 2
+                and all(isinstance(k, (int, np.integer)) for k in key)):
+            i, j = (int(k) + self.num_points if k < 0 else int(k) for k in key)
+            if not (0 <= i < self.num_points and 0 <= j < self.num_points):
+                raise IndexError("index out of bounds for PackedTriangle.")
+            if i > j:
+                return self.data[i * (i - 1) // 2 + j]
+            return self.dtype.type(self.fill)
+        return self.toarray()[key]
+
+    def __getattr__(self, name):
+        # fall back on the dense array for any other array attribute/method
+        if name.startswith("_") or name in ("data", "num_points", "fill"):
+            raise AttributeError(name)
+        return getattr(self.toarray(), name)
+
+    def __len__(self):
+        return self.num_points
+
+    def __repr__(self):
+        return f"PackedTriangle(num_points={self.num_points}, dtype={self.dtype})"
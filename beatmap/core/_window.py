@@ -0,0 +1,125 @@
+from collections import namedtuple
+
+import numpy as np
+
+from . import _bet
+
+__all__ = [
+    "SummedAreaIndex",
+]
+
+WindowStats = namedtuple("WindowStats", "count mean var")
+
+# quantities of bet_results indexed, each stored as a sum and sum of squares
+_QUANTITIES = ("ssa", "err", "c")
+
+
+class SummedAreaIndex:
+    """
+    Statistics of the valid relative pressure ranges within windows of
+    start and end relative pressures.
+
+    The valid ranges form a 2D grid indexed by the last and first data point
+    of the range. The index stores summed-area tables, ie 2D prefix sums, of
+    the number of valid ranges and of the sums and sums of squares of their
+    ssa, err and c. The count, mean and variance of any rectangular window
+    of the grid then take four lookups per table, regardless of the size of
+    the window. Values are centered on their mean over all valid ranges
+    before summing, to limit round-off in the variance.
+
+    Parameters
+    ----------
+    bet_results : namedtuple
+        Output of the bet function.
+    mask_results : namedtuple
+        Output of the rouq_mask function, only ranges that are not masked
+        are included.
+
+    Examples
+    --------
+    Mean and variance of the valid ssa for ranges starting between relp 0.05
+    and 0.1 and ending between 0.25 and 0.3:
+
+    >>> index = SummedAreaIndex(bet_results, mask_results)  # doctest: +SKIP
+    >>> stats = index.query((0.05, 0.1), (0.25, 0.3), "ssa")  # doctest: +SKIP
+
+    """
+
+    def __init__(self, bet_results, mask_results):
+        _bet._require_ssa(bet_results)
+        self.relp = np.asarray(bet_results.iso_df.relp, dtype=float)
+        valid = ~np.asarray(mask_results.mask)
+        num_points = len(self.relp)
+
+        grids = [valid.astype(float)]
+        self.shift = {}
+        for quantity in _QUANTITIES:
+            values = np.asarray(getattr(bet_results, quantity), dtype=float)
+            self.shift[quantity] = values[valid].mean() if valid.any() else 0.0
+            centered = np.where(valid, values - self.shift[quantity], 0)
+            grids += [centered, centered ** 2]
+
+        # tables[:, a, b] is the sum over ranges with end < a and start < b
+        self._tables = np.zeros((len(grids), num_points + 1, num_points + 1))
+        self._tables[:, 1:, 1:] = np.stack(grids).cumsum(axis=1).cumsum(axis=2)
+
+    def _indices(self, window):
+        # half open range of data points with relp in the closed window
+        if window is None:
+            return 0, len(self.relp)
+        if np.any(np.diff(self.relp) < 0):
+            raise ValueError("Relative pressure must be increasing to query by relp.")
+        low, high = window
+        return (np.searchsorted(self.relp, low, side="left"),
+                np.searchsorted(self.relp, high, side="right"))
+
+    def _sums(self, begin, end):
+        j0, j1 = begin
+        i0, i1 = end
+        j1 = np.maximum(j0, j1)
+        i1 = np.maximum(i0, i1)
+        tables = self._tables
+        return (tables[:, i1, j1] - tables[:, i0, j1]
+                - tables[:, i1, j0] + tables[:, i0, j0])
+
+    def query(self, begin_relp=None, end_relp=None, quantity="ssa"):
+        """
+        Returns the count, mean and variance of a quantity over the valid
+        ranges in a window.
+
+        Parameters
+        ----------
+        begin_relp : tuple of float
+            (low, high), only ranges whose first data point has a relative
+            pressure within the window are included. If None, ranges with
+            any first data point are included.
+        end_relp : tuple of float
+            (low, high), the same for the last data point of the ranges.
+        quantity : str
+            One of 'ssa', 'err' or 'c'.
+
+        The bounds can be arrays, to query many windows at once, each
+        result is then an array of the broadcast shape of the bounds.
+
+        Returns
+        -------
+        WindowStats : namedtuple
+            Contains ``count``, ``mean`` and ``var``, the population
+            variance. Mean and variance are nan for windows without valid
+            ranges.
+
+        """
+        if quantity not in _QUANTITIES:
+            msg = f"Invalid quantity, must be one of {', '.join(_QUANTITIES)}."
+            raise ValueError(msg)
+        sums = self._sums(self._indices(begin_relp), self._indices(end_relp))
+        k = 1 + 2 * _QUANTITIES.index(quantity)
+        count = np.rint(sums[0]).astype(int)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums[k] / count
+            var = np.maximum(sums[k + 1] / count - mean ** 2, 0)
+        mean = np.where(count > 0, mean + self.shift[quantity], np.nan)
+        var = np.where(count > 0, var, np.nan)
+        if count.ndim == 0:
+            return WindowStats(int(count), float(mean), float(var))
+        return WindowStats(count, mean, var)
@@ -7,3 +7,6 @@ io
 """
 
 from ._dataio import *
+from ._cache import *
+from ._archive import *
+from ._store import *
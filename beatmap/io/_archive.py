@@ -0,0 +1,289 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from beatmap import core
+from beatmap import utils as util
+
+log = util.get_logger(__name__)
+
+__all__ = [
+    "ResultArchive",
+]
+
+# one value per data point of each isotherm
+_POINT_FIELDS = {"relp": "<f8", "n": "<f8", "bet": "<f8"}
+# one value per relative pressure range of each isotherm, in packed row-major order
+_RANGE_FIELDS = {"intercept": "<f8", "nm": "<f8", "slope": "<f8", "ssa": "<f8",
+                 "c": "<f8", "err": "<f8", "r": "<f8", "num_pts": "<f8",
+                 "valid": "|b1"}
+_MANIFEST = "manifest.json"
+
+
+class ResultArchive:
+    """
+    Append-only archive of the BET results of many isotherms, read through
+    memory maps.
+
+    Each quantity of ``bet_results`` is stored in its own binary file, eg
+    ``err.bin``, where the results of one isotherm after another are
+    appended as the cells below the diagonal, in the packed row-major order
+    of ``PackedTriangle``. The isotherm data is stored the same way, one
+    value per data point. A JSON manifest records the offsets of every
+    isotherm in the files, along with its info, source file and backend.
+
+    Reading an isotherm only maps its part of the files it needs, arrays are
+    ``PackedTriangle`` objects backed by read-only ``np.memmap`` views, so
+    archives much larger than memory can be queried one isotherm and one
+    quantity at a time.
+
+    The validity of each range from ``rouq_mask`` can be archived with the
+    results, the individual checks are not stored.
+
+    The manifest is replaced atomically after the data is written, so
+    readers only see complete isotherms, but only one process should
+    append to an archive at a time.
+
+    Parameters
+    ----------
+    directory : str or Path
+        Directory of the archive, created if it does not exist.
+
+    Examples
+    --------
+    >>> archive = ResultArchive("results")  # doctest: +SKIP
+    >>> archive.append(bet_results, mask_results)  # doctest: +SKIP
+    >>> err = archive.get(1234, "err")  # doctest: +SKIP
+
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / _MANIFEST
+        if path.exists():
+            self._samples = json.loads(path.read_text())["samples"]
+        else:
+            self._samples = []
+
+    def __len__(self):
+        return len(self._samples)
+
+    def summary(self):
+        """
+        Returns a DataFrame with one row per archived isotherm, in the order
+        they were appended, with the columns ``info``, ``file``,
+        ``num_points``, ``backend`` and ``has_mask``.
+
+        """
+        columns = ["info", "file", "num_points", "backend", "has_mask"]
+        return pd.DataFrame([{c: sample[c] for c in columns} for sample in self._samples],
+                            columns=columns)
+
+    def _offsets(self):
+        # first data point and range after the archived isotherms
+        if not self._samples:
+            return 0, 0
+        last = self._samples[-1]
+        num_points = last["num_points"]
+        return (last["point_offset"] + num_points,
+                last["range_offset"] + num_points * (num_points - 1) // 2)
+
+    def append(self, bet_results, mask_results=None, file=None):
+        """
+        Adds the results of one isotherm to the archive.
+
+        Parameters
+        ----------
+        bet_results : namedtuple
+            Output of the bet function, dense or packed.
+        mask_results : namedtuple
+            Output of the rouq_mask function, if given the validity of each
+            range is archived.
+        file : str
+            Source file of the isotherm, recorded in the manifest.
+
+        Returns
+        -------
+        index : int
+            Index of the isotherm in the archive.
+
+        """
+        return self.extend([bet_results], [mask_results], [file])[0]
+
+    def extend(self, bet_results, mask_results=None, files=None):
+        """
+        Adds the results of several isotherms to the archive, see
+        ``append``. The manifest is only written once.
+
+        Parameters
+        ----------
+        bet_results : list of namedtuple
+            Outputs of the bet function.
+        mask_results : list of namedtuple
+            Outputs of the rouq_mask function, or None.
+        files : list of str
+            Source files of the isotherms, or None.
+
+        Returns
+        -------
+        indices : list of int
+            Indices of the isotherms in the archive.
+
+        """
+        bet_results = list(bet_results)
+        if not bet_results:
+            return []
+        mask_results = mask_results or [None] * len(bet_results)
+        files = files or [None] * len(bet_results)
+        point_offset, range_offset = self._offsets()
+        start = len(self._samples)
+
+        points = {field: [] for field in _POINT_FIELDS}
+        ranges = {field: [] for field in _RANGE_FIELDS}
+        samples = []
+        for results, masks, file in zip(bet_results, mask_results, files):
+            num_points = len(results.iso_df)
+            for field in _POINT_FIELDS:
+                points[field].append(results.iso_df[field].values)
+            for field in _RANGE_FIELDS:
+                if field == "valid":
+                    values = None if masks is None else ~np.asarray(masks.mask)
+                else:
+                    values = getattr(results, field)
+                ranges[field].append(_packed_data(values, num_points))
+            samples.append({"info": results.info,
+                            "file": None if file is None else str(file),
+                            "num_points": num_points,
+                            "backend": results.backend,
+                            "has_ssa": results.ssa is not None,
+                            "has_mask": masks is not None,
+                            "point_offset": point_offset,
+                            "range_offset": range_offset})
+            point_offset += num_points
+            range_offset += num_points * (num_points - 1) // 2
+
+        for field, dtype in _POINT_FIELDS.items():
+            self._write(field, dtype, samples[0]["point_offset"], points[field])
+        for field, dtype in _RANGE_FIELDS.items():
+            self._write(field, dtype, samples[0]["range_offset"], ranges[field])
+
+        self._samples.extend(samples)
+        self._write_manifest()
+        return list(range(start, len(self._samples)))
+
+    def _write(self, field, dtype, offset, arrays):
+        # write at the offset the manifest ends at, and drop anything after
+        # it, eg data of an append that was interrupted before the manifest
+        path = self.directory / f"{field}.bin"
+        with open(path, "r+b" if path.exists() else "w+b") as f:
+            f.seek(offset * np.dtype(dtype).itemsize)
+            for values in arrays:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            f.truncate()
+
+    def _write_manifest(self):
+        manifest = {"fields": {**_POINT_FIELDS, **_RANGE_FIELDS},
+                    "samples": self._samples}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self.directory / _MANIFEST)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def _map(self, field, offset, count):
+        dtype = np.dtype({**_POINT_FIELDS, **_RANGE_FIELDS}[field])
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.directory / f"{field}.bin", dtype=dtype, mode="r",
+                         offset=offset * dtype.itemsize, shape=(count,))
+
+    def _sample(self, index):
+        try:
+            return self._samples[index]
+        except (IndexError, TypeError):
+            raise IndexError(f"No isotherm {index} in archive of {len(self)}.")
+
+    def get(self, index, field):
+        """
+        Returns one quantity of an archived isotherm.
+
+        Parameters
+        ----------
+        index : int
+            Index of the isotherm, in the order they were appended.
+        field : str
+            Name of a ``bet_results`` array, eg 'err', or 'valid' for the
+            ranges not masked by ``rouq_mask``, or one of the isotherm data
+            columns 'relp', 'n' and 'bet'.
+
+        Returns
+        -------
+        values : PackedTriangle or ndarray
+            Read-only view of the archive, a ``PackedTriangle`` for
+            quantities of the relative pressure ranges, a 1D array for the
+            isotherm data. None if the quantity was not archived for the
+            isotherm, ie ssa computed without a_o or validity without
+            mask_results.
+
+        """
+        sample = self._sample(index)
+        num_points = sample["num_points"]
+        if field in _POINT_FIELDS:
+            return self._map(field, sample["point_offset"], num_points)
+        if field not in _RANGE_FIELDS:
+            fields = list(_POINT_FIELDS) + list(_RANGE_FIELDS)
+            raise ValueError(f"Invalid field, must be one of {', '.join(fields)}.")
+        if ((field == "ssa" and not sample["has_ssa"])
+                or (field == "valid" and not sample["has_mask"])):
+            return None
+        values = self._map(field, sample["range_offset"],
+                           num_points * (num_points - 1) // 2)
+        return core.PackedTriangle(values, num_points)
+
+    def load(self, index):
+        """
+        Returns the results of an archived isotherm.
+
+        Parameters
+        ----------
+        index : int
+            Index of the isotherm, in the order they were appended.
+
+        Returns
+        -------
+        batch_results : namedtuple
+            Contains ``bet_results``, with the arrays as read-only
+            ``PackedTriangle`` views of the archive, and ``mask_results``,
+            a ``rouq_mask`` named tuple with only the mask (the checks are
+            None), or None if no mask was archived.
+
+        """
+        sample = self._sample(index)
+        iso_df = pd.DataFrame({field: self.get(index, field) for field in _POINT_FIELDS})
+        arrays = {field: self.get(index, field) for field in _RANGE_FIELDS}
+        valid = arrays.pop("valid")
+        bet_results = core.BETResults(iso_df=iso_df, info=sample["info"],
+                                      backend=sample["backend"], **arrays)
+        mask_results = None
+        if valid is not None:
+            mask_results = core.RouqMask(~valid.toarray(), None, None, None, None,
+                                         None, sample["backend"])
+        return core.BatchResults(bet_results, mask_results)
+
+
+def _packed_data(values, num_points):
+    """Returns the cells below the diagonal of values, zeros if None."""
+    if values is None:
+        return np.zeros(num_points * (num_points - 1) // 2)
+    if isinstance(values, core.PackedTriangle):
+        return values.data
+    i, j = np.tril_indices(num_points, -1)
+    return np.asarray(values)[i, j]
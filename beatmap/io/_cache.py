@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from beatmap import core
+from beatmap import utils as util
+from beatmap.version import __version__
+
+log = util.get_logger(__name__)
+
+__all__ = [
+    "ResultCache",
+]
+
+_BET_FIELDS = ("intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts")
+_MASK_FIELDS = ("mask", "check1", "check2", "check3", "check4", "check5")
+
+
+class ResultCache:
+    """
+    Persistent cache of BET analysis results, stored in a directory.
+
+    Results are content addressed, the key of an analysis is a SHA-256 hash
+    of the relative pressures and amounts adsorbed of the isotherm, the
+    cross sectional area of the adsorbate, the analysis settings and the
+    BEaTmap version. Re-analyzing the same data with the same settings then
+    only costs reading one compressed ``.npz`` file.
+
+    Files are written to a temporary file and moved into place, so readers
+    never see a partially written file and several processes can share a
+    cache directory. When the files of the cache take more than
+    ``max_bytes`` the least recently used ones are deleted.
+
+    Parameters
+    ----------
+    directory : str or Path
+        Directory where results are stored, created if it does not exist.
+    max_bytes : int
+        Maximum size of the cache, in bytes. If None the cache is never
+        pruned.
+
+    Examples
+    --------
+    >>> cache = ResultCache("beatmap_cache")  # doctest: +SKIP
+    >>> bet_results, mask_results = cache.analyze(*isotherm_data)  # doctest: +SKIP
+
+    """
+
+    def __init__(self, directory, max_bytes=2 ** 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return self.directory / f"{key}.npz"
+
+    def _files(self):
+        return list(self.directory.glob("*.npz"))
+
+    @property
+    def nbytes(self):
+        """Size of the cached results on disk, in bytes."""
+        stats = [_stat(path) for path in self._files()]
+        return sum(stat.st_size for stat in stats if stat is not None)
+
+    def __len__(self):
+        return len(self._files())
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def key(self, iso_df, a_o, **settings):
+        """
+        Returns the key of the results of an analysis.
+
+        Parameters
+        ----------
+        iso_df : DataFrame
+            Isotherm data, output by a data import function, only the relp
+            and n columns are used.
+        a_o : float
+            Cross sectional area of adsorbate, in square Angstrom.
+        **settings
+            Settings of the analysis, eg the parameters passed to ``bet``
+            and ``rouq_mask``. Values must be JSON serializable.
+
+        Returns
+        -------
+        key : str
+            Hexadecimal SHA-256 digest.
+
+        """
+        return _digest(iso_df, a_o=a_o, settings=settings, version=__version__)
+
+    def load(self, key):
+        """
+        Returns cached results, or None if key is not in the cache.
+
+        Returns
+        -------
+        batch_results : namedtuple
+            Contains ``bet_results`` and ``mask_results``, the latter is None
+            if no ``rouq_mask`` results were saved.
+
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            log.warning(f"Removing unreadable cache file {path.name}.")
+            _remove(path)
+            return None
+        # mark as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        meta = json.loads(str(arrays.pop("meta")))
+        iso_df = pd.DataFrame({"relp": arrays.pop("relp"), "n": arrays.pop("n"),
+                               "bet": arrays.pop("bet")})
+        fields = {}
+        for field in _BET_FIELDS:
+            values = arrays.pop(field, None)
+            if values is not None and meta["packed"]:
+                values = core.PackedTriangle(values, len(iso_df))
+            fields[field] = values
+        bet_results = core.BETResults(iso_df=iso_df, info=meta["info"],
+                                      backend=meta["backend"], **fields)
+        mask_results = None
+        if "mask" in arrays:
+            mask_results = core.RouqMask(*(arrays[f] for f in _MASK_FIELDS),
+                                         meta["mask_backend"])
+        return core.BatchResults(bet_results, mask_results)
+
+    def save(self, key, bet_results, mask_results=None):
+        """
+        Stores results in the cache, replacing any results with the same key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the results, see ``key``.
+        bet_results : namedtuple
+            Output of the bet function.
+        mask_results : namedtuple
+            Output of the rouq_mask function, optional.
+
+        """
+        packed = isinstance(bet_results.nm, core.PackedTriangle)
+        iso_df = bet_results.iso_df
+        arrays = {"relp": iso_df.relp.values, "n": iso_df.n.values,
+                  "bet": iso_df.bet.values}
+        for field in _BET_FIELDS:
+            values = getattr(bet_results, field)
+            if values is not None:
+                arrays[field] = values.data if packed else np.asarray(values)
+        meta = {"packed": packed, "info": bet_results.info,
+                "backend": bet_results.backend, "mask_backend": None}
+        if mask_results is not None:
+            for field in _MASK_FIELDS:
+                arrays[field] = np.asarray(getattr(mask_results, field))
+            meta["mask_backend"] = mask_results.backend
+        arrays["meta"] = np.array(json.dumps(meta))
+
+        # write to a temporary file and move it into place, which is atomic
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            _remove(Path(tmp))
+            raise
+        self._evict(keep=self._path(key))
+
+    def _evict(self, keep=None):
+        # delete least recently used files until the cache fits in max_bytes
+        if self.max_bytes is None:
+            return
+        files = [(_stat(path), path) for path in self._files()]
+        files = [(stat.st_mtime, stat.st_size, path) for stat, path in files
+                 if stat is not None]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            _remove(path)
+            total -= size
+
+    def clear(self):
+        """Deletes all cached results."""
+        for path in self._files():
+            _remove(path)
+
+    def analyze(self, iso_df, a_o, info=None, *args,
+                packed=False,
+                min_points=None,
+                max_points=None,
+                relp_window=None,
+                backend=None,
+                **mask_kwargs):
+        """
+        Returns the results of ``bet`` and ``rouq_mask`` for an isotherm,
+        from the cache if they were computed before with the same settings.
+
+        Rather than pass individual parameters, this function can accept
+        ``isotherm_data`` (where ``isotherm_data`` is a named tuple output by
+        a data import function).
+
+        Parameters
+        ----------
+        iso_df, a_o, info, packed, min_points, max_points, relp_window,
+        backend
+            Same as in ``bet``.
+        **mask_kwargs
+            Parameters passed to ``rouq_mask``, eg ``min_num_points``.
+
+        Returns
+        -------
+        batch_results : namedtuple
+            Contains ``bet_results`` and ``mask_results``. ``info`` is set
+            to the one passed, it is not part of the key.
+
+        """
+        backend = core.get_backend(backend).name
+        bet_kwargs = dict(packed=packed, min_points=min_points,
+                          max_points=max_points, relp_window=relp_window,
+                          backend=backend)
+        key = self.key(iso_df, a_o, **bet_kwargs, **mask_kwargs)
+        results = self.load(key)
+        if results is not None and results.mask_results is not None:
+            bet_results = results.bet_results._replace(info=info)
+            return core.BatchResults(bet_results, results.mask_results)
+
+        bet_results = core.bet(iso_df, a_o, info, **bet_kwargs)
+        mask_results = core.rouq_mask(*bet_results, backend=backend, **mask_kwargs)
+        self.save(key, bet_results, mask_results)
+        return core.BatchResults(bet_results, mask_results)
+
+
+def _digest(iso_df, **meta):
+    """Returns the SHA-256 digest of the relp and n of iso_df, and of meta."""
+    digest = hashlib.sha256()
+    meta = {"num_points": len(iso_df), **meta}
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+    for column in ("relp", "n"):
+        values = np.ascontiguousarray(iso_df[column], dtype="<f8")
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _stat(path):
+    """Returns the stat of path, or None if it was removed meanwhile."""
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _remove(path):
+    """Removes a file, which another process may have removed already."""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
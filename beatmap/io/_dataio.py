@@ -1,3 +1,4 @@
+import importlib.util
 from collections import namedtuple
 from pathlib import Path
 
@@ -16,10 +17,15 @@ __all__ = [
     "export_raw_data",
     "export_processed_data",
     "import_list_data",
+    "import_long_data",
     "load_vulcan_dataset",
 ]
 
 iso_data = namedtuple("iso_data", "iso_df a_o info file")
+iso_stack = namedtuple("iso_stack", "sample_id relp n a_o info")
+
+# pyarrow is optional, it is needed for parquet files and speeds up csv parsing
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
 
 
 def check_header(file, th=0.9):
@@ -64,6 +70,8 @@ def import_data(file=None, info=None, a_o=None):
         Short description of data, will be used as identifier
     a_o : float
         Cross sectional area of the adsorbate molecule, in square angstrom.
+        Can be None, eg if the specific surface area is calculated later
+        with ``beatmap.core.with_adsorbate``.
 
     Returns
     -------
@@ -76,13 +84,15 @@ def import_data(file=None, info=None, a_o=None):
         - ``isotherm_data.file`` (str) : file name or path.
 
     """
-    msg = f"Adsorbate has an adsorbed cross sectional area of {a_o:.2f} sq. Angstrom."
-    log.info(msg)
+    if a_o is not None and not isinstance(a_o, str):
+        msg = f"Adsorbate has an adsorbed cross sectional area of {a_o:.2f} sq. Angstrom."
+        log.info(msg)
 
     if not isinstance(file, pd.DataFrame):  # workaround for streamlit app cache to work
         data = pd.read_csv(file, header="infer")
     else:
-        data = file
+        # work on a copy, the caller's frame is never modified
+        data = file.copy()
 
     try:
         header = data.columns
@@ -93,7 +103,7 @@ def import_data(file=None, info=None, a_o=None):
         pass
 
     labels = list(data)
-    data.rename(columns={labels[0]: "relp", labels[1]: "n"}, inplace=True)
+    data = data.rename(columns={labels[0]: "relp", labels[1]: "n"})
 
     if type(a_o) == str:
         raise ValueError("a_o must be int or float.")
@@ -175,10 +185,11 @@ def import_list_data(relp, n, a_o=None, file=None, info=None):
         - ``isotherm_data.file`` (str) : file name or path.
 
     """
-    if not isinstance(a_o, (int, float)):
-        raise ValueError("a_o must be int or float.")
-
-    log.info(f"Adsorbate has an adsorbed cross sectional area of {a_o:.2f} sq. Angstrom.")
+    if a_o is not None:
+        if not isinstance(a_o, (int, float)):
+            raise ValueError("a_o must be int or float.")
+        log.info("Adsorbate has an adsorbed cross sectional area of "
+                 f"{a_o:.2f} sq. Angstrom.")
 
     # importing data and creating 'bet' and 'check2' data points
     dict_from_lists = {"relp": relp, "n": n}
@@ -232,6 +243,117 @@ def import_list_data(relp, n, a_o=None, file=None, info=None):
     return isotherm_data
 
 
+def import_long_data(file, a_o=None, stack=False, sample_col="sample_id",
+                     relp_col="relp", n_col="n"):
+    """Imports many isotherms from one table in long format.
+
+    The table has one row per data point, with a column identifying the
+    sample, eg as exported by a LIMS::
+
+        sample_id,relp,n
+        A1,0.05,0.0021
+        A1,0.10,0.0025
+        ...
+
+    The table is read column-wise, only the three columns used are parsed,
+    and split by sample with one stable sort, so the cost does not depend on
+    the number of samples. Data points of a sample keep their order in the
+    table.
+
+    Parquet files (.parquet or .pq) require the optional pyarrow package,
+    which is also used to parse csv files when it is installed.
+
+    Unlike ``import_data``, the type of each isotherm is not determined,
+    samples where n is not increasing are only reported in one warning.
+
+    Parameters
+    ----------
+    file : str, Path or DataFrame
+        Path to a csv or Parquet file, or a DataFrame, in long format.
+    a_o : float
+        Cross sectional area of the adsorbate molecule, in square angstrom,
+        used for all samples.
+    stack : bool
+        If True, the isotherms are returned as 2D arrays with one row per
+        sample, which can be passed to ``bet_batch``. All samples must then
+        have the same number of data points.
+    sample_col, relp_col, n_col : str
+        Names of the columns of the sample identifiers, relative pressures
+        and amounts adsorbed, in mol/g.
+
+    Returns
+    -------
+    list of isotherm_data or iso_stack : namedtuple
+        One ``isotherm_data`` named tuple per sample, as returned by
+        ``import_data``, with the sample identifier as ``info``, in the
+        order of the sorted identifiers. If stack is True, an ``iso_stack``
+        named tuple with fields ``sample_id`` (sorted identifiers),
+        ``relp`` and ``n`` (2D arrays), ``a_o`` and ``info`` (the
+        identifiers as strings).
+
+    Examples
+    --------
+    >>> isotherms = import_long_data("lims_export.csv", a_o=16.2)  # doctest: +SKIP
+    >>> batch_results = bt.core.bet_batch(isotherms)  # doctest: +SKIP
+
+    >>> data = import_long_data("lims.parquet", a_o=16.2, stack=True)  # doctest: +SKIP
+    >>> batch_results = bt.core.bet_batch(data.n, relp=data.relp, a_o=data.a_o,
+    ...                                   info=data.info)  # doctest: +SKIP
+
+    """
+    if a_o is not None and not isinstance(a_o, (int, float)):
+        raise ValueError("a_o must be int or float.")
+
+    columns = [sample_col, relp_col, n_col]
+    if isinstance(file, pd.DataFrame):
+        data = file[columns]
+    elif str(file).lower().endswith((".parquet", ".pq")):
+        if not HAS_PYARROW:
+            raise ImportError("Reading Parquet files requires pyarrow, install it "
+                              "with: pip install beatmap[parquet]")
+        data = pd.read_parquet(file, columns=columns)
+    else:
+        engine = "pyarrow" if HAS_PYARROW else "c"
+        data = pd.read_csv(file, usecols=columns, engine=engine)
+
+    ids = data[sample_col].to_numpy()
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    relp = data[relp_col].to_numpy(dtype=float)[order]
+    n = data[n_col].to_numpy(dtype=float)[order]
+    sample_ids, starts, counts = np.unique(ids, return_index=True, return_counts=True)
+
+    if (n == 0).any():
+        samples = ", ".join(str(x) for x in np.unique(ids[n == 0]))
+        raise ValueError(f"Cannot have n = 0 values in dataframe, samples: {samples}.")
+    bet = (1 / n) * (relp / (1 - relp))
+
+    # checking data quality, differences across samples are not compared
+    decreasing = np.diff(n) < 0
+    decreasing[starts[1:] - 1] = False
+    if decreasing.any():
+        suspect = np.unique(ids[1:][decreasing])
+        samples = ", ".join(str(x) for x in suspect[:5])
+        samples += ", ..." if len(suspect) > 5 else ""
+        log.warning("Isotherm data is suspect. Moles do not consistently increase "
+                    f"as P/P0 increases in {len(suspect)} samples: {samples}.")
+
+    infos = [str(x) for x in sample_ids]
+    if stack:
+        if len(counts) > 0 and (counts != counts[0]).any():
+            raise ValueError("All samples must have the same number of data points "
+                             "to be stacked.")
+        shape = (len(sample_ids), counts[0] if len(counts) > 0 else 0)
+        return iso_stack(sample_ids, relp.reshape(shape), n.reshape(shape), a_o, infos)
+
+    file = None if isinstance(file, pd.DataFrame) else file
+    return [
+        iso_data(pd.DataFrame({"relp": x, "n": y, "bet": z}), a_o, info, file)
+        for x, y, z, info in zip(np.split(relp, starts[1:]), np.split(n, starts[1:]),
+                                 np.split(bet, starts[1:]), infos)
+    ]
+
+
 def export_raw_data(isotherm_data):
     """Exports isothermal adsoprtion data.
 
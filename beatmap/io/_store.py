@@ -0,0 +1,271 @@
+import contextlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from beatmap import core
+from beatmap import utils as util
+
+from ._cache import _digest
+
+log = util.get_logger(__name__)
+
+__all__ = [
+    "ResultStore",
+]
+
+# columns of the summary table, and their SQL types
+_COLUMNS = {
+    "file": "TEXT",
+    "info": "TEXT",
+    "input_hash": "TEXT",
+    "num_points": "INTEGER",
+    "num_valid": "INTEGER",
+    "ssa_error": "REAL",
+    "ssa_points": "REAL",
+    "ssa_max": "REAL",
+    "ssa_min": "REAL",
+    "c": "REAL",
+    "nm": "REAL",
+    "err": "REAL",
+    "num_pts": "INTEGER",
+    "begin_relp": "REAL",
+    "end_relp": "REAL",
+}
+_INDEXED = ("file", "input_hash", "ssa_error", "ssa_points", "c", "num_valid")
+
+
+class ResultStore:
+    """
+    SQLite database of summaries of analyzed isotherms.
+
+    Each analyzed isotherm is one row of the ``samples`` table, with its
+    file, info, a SHA-256 hash of its relative pressures and amounts
+    adsorbed (``input_hash``), its number of data points and of valid
+    relative pressure ranges, the specific surface area answer of each
+    criterion of ``ssa_answer`` (``ssa_error``, ``ssa_points``, ``ssa_max``
+    and ``ssa_min``) and the ``c``, ``nm``, ``err``, ``num_pts``,
+    ``begin_relp`` and ``end_relp`` of the range with the lowest error.
+    Answers are those ranked first by ``ssa_answers``, values are NULL for
+    isotherms without valid ranges. The ``ssa_*`` columns are also NULL for
+    results computed without an a_o, the other columns are filled.
+
+    The file, input hash, ``ssa_error``, ``ssa_points``, ``c`` and
+    ``num_valid`` columns are indexed, so queries on them do not scan the
+    table.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path of the database file, created if it does not exist.
+
+    Examples
+    --------
+    >>> store = ResultStore("results.sqlite")  # doctest: +SKIP
+    >>> store.insert(bet_results, mask_results, file="sample.csv")  # doctest: +SKIP
+    >>> store.query(ssa_error=(500, 800), c=(50, None))  # doctest: +SKIP
+
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        # transactions are started explicitly, see _transaction
+        self._connection = sqlite3.connect(self.path, isolation_level=None)
+        # readers are not blocked while a batch is written
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{name} {kind}" for name, kind in _COLUMNS.items())
+        with self._transaction() as connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS samples "
+                               f"(id INTEGER PRIMARY KEY, {columns})")
+            for name in _INDEXED:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS samples_{name} ON samples ({name})")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE locks the database for writing up front, rather
+        # than at the first write, so writers wait on each other instead of
+        # failing to upgrade a read lock
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the connection to the database."""
+        self._connection.close()
+
+    def insert(self, bet_results, mask_results, file=None):
+        """
+        Adds the summary of one analyzed isotherm.
+
+        Parameters
+        ----------
+        bet_results : namedtuple
+            Output of the bet function.
+        mask_results : namedtuple
+            Output of the rouq_mask function.
+        file : str
+            Source file of the isotherm.
+
+        Returns
+        -------
+        id : int
+            Id of the row in the samples table.
+
+        """
+        return self.insert_many([bet_results], [mask_results], [file])[0]
+
+    def insert_many(self, bet_results, mask_results, files=None):
+        """
+        Adds the summaries of several analyzed isotherms in one transaction,
+        see ``insert``.
+
+        Parameters
+        ----------
+        bet_results : list of namedtuple
+            Outputs of the bet function.
+        mask_results : list of namedtuple
+            Outputs of the rouq_mask function.
+        files : list of str
+            Source files of the isotherms, or None.
+
+        Returns
+        -------
+        ids : list of int
+            Ids of the rows in the samples table.
+
+        """
+        bet_results = list(bet_results)
+        files = files or [None] * len(bet_results)
+        rows = [_summary(results, masks, file)
+                for results, masks, file in zip(bet_results, mask_results, files)]
+        names = ", ".join(_COLUMNS)
+        values = ", ".join("?" * len(_COLUMNS))
+        statement = f"INSERT INTO samples ({names}) VALUES ({values})"
+        ids = []
+        with self._transaction() as connection:
+            for row in rows:
+                cursor = connection.execute(statement, [row[name] for name in _COLUMNS])
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def query(self, order_by=None, limit=None, **conditions):
+        """
+        Returns the rows of the samples table that meet all conditions.
+
+        Parameters
+        ----------
+        order_by : str
+            Column the rows are sorted by, prefix it with '-' for descending
+            order. Rows are otherwise in the order of insertion.
+        limit : int
+            Maximum number of rows returned.
+        **conditions
+            Conditions on columns of the table, either a value the column
+            must be equal to, or a (low, high) tuple of inclusive bounds,
+            where None is unbounded. eg ``ssa_error=(500, 800)``.
+
+        Returns
+        -------
+        DataFrame
+            Rows of the samples table, indexed by id.
+
+        """
+        clauses = []
+        params = []
+        for column, condition in conditions.items():
+            _check_column(column)
+            if isinstance(condition, tuple):
+                low, high = condition
+                if low is not None:
+                    clauses.append(f"{column} >= ?")
+                    params.append(_scalar(low))
+                if high is not None:
+                    clauses.append(f"{column} <= ?")
+                    params.append(_scalar(high))
+            elif condition is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(_scalar(condition))
+
+        statement = "SELECT * FROM samples"
+        if clauses:
+            statement += " WHERE " + " AND ".join(clauses)
+        order = "id"
+        if order_by is not None:
+            column = order_by.lstrip("-")
+            _check_column(column)
+            # ties are kept in the order of insertion
+            order = f"{column}{' DESC' if order_by.startswith('-') else ''}, id"
+        statement += f" ORDER BY {order}"
+        if limit is not None:
+            statement += " LIMIT ?"
+            params.append(int(limit))
+        return self.sql(statement, params)
+
+    def sql(self, statement, params=()):
+        """
+        Returns the result of an SQL query on the database as a DataFrame,
+        indexed by id if it is one of the columns.
+
+        """
+        frame = pd.read_sql_query(statement, self._connection, params=params)
+        if "id" in frame:
+            frame = frame.set_index("id")
+        return frame
+
+
+def _scalar(value):
+    """Converts numpy scalars, which sqlite3 does not accept, to Python ones."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _check_column(column):
+    if column not in _COLUMNS:
+        raise ValueError(f"Invalid column, must be one of {', '.join(_COLUMNS)}.")
+
+
+def _summary(bet_results, mask_results, file=None):
+    """Returns the row of the samples table of an analyzed isotherm."""
+    row = dict.fromkeys(_COLUMNS)
+    row.update(file=None if file is None else str(file),
+               info=bet_results.info,
+               input_hash=_digest(bet_results.iso_df),
+               num_points=len(bet_results.iso_df),
+               num_valid=int((~np.asarray(mask_results.mask)).sum()))
+    if row["num_valid"] == 0:
+        return row
+
+    # the range with the lowest error, found from err as there may be no ssa
+    err = np.asarray(bet_results.err, dtype=float)
+    i, j = np.nonzero(~np.asarray(mask_results.mask) & (err != 0) & ~np.isnan(err))
+    if len(i):
+        k = np.argmin(err[i, j])
+        i, j = i[k], j[k]
+        relp = np.asarray(bet_results.iso_df.relp)
+        row.update(c=float(bet_results.c[i, j]),
+                   nm=float(bet_results.nm[i, j]),
+                   err=float(err[i, j]),
+                   num_pts=int(bet_results.num_pts[i, j]),
+                   begin_relp=float(relp[j]),
+                   end_relp=float(relp[i]))
+    if bet_results.ssa is not None:
+        best = core.ssa_answers(bet_results, mask_results, k=1).xs(0, level="rank")
+        for criterion, answer in best.iterrows():
+            row[f"ssa_{criterion}"] = float(answer.ssa)
+    return row
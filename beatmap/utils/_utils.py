@@ -9,6 +9,7 @@ __all__ = [
     "index_of_value",
     "max_min",
     "lin_interp",
+    "lin_interp_array",
     "get_fixtures_path",
     "get_datasets_path",
     "find_package_root",
@@ -103,6 +104,77 @@ def lin_interp(df, val):
     return interp_val
 
 
+def lin_interp_array(n, relp, val):
+    """Linearly interpolates the relp corresponding to many values of n.
+
+    Array version of ``lin_interp``, which gives the same results for each
+    value, including the extrapolation below the first data point (the
+    relp of the first point) and above the last one (along the last two
+    data points).
+
+    Parameters
+    ----------
+    n : array
+        Amount adsorbed of the data points. If 2D, each row is a separate
+        isotherm.
+    relp : array
+        Relative pressure of the data points, same shape as ``n``.
+    val : array_like
+        Values of n to find the relp of. If ``n`` is 2D, a 2D array with
+        the values of each isotherm in the corresponding row.
+
+    Returns
+    -------
+    interp_val : ndarray
+        The relp corresponding to each value of val, same shape as val.
+
+    """
+    n = np.asarray(n, dtype=float)
+    relp = np.asarray(relp, dtype=float)
+    val = np.asarray(val, dtype=float)
+    if n.size == 0:
+        raise ValueError("At least one data point is required to interpolate.")
+
+    if n.ndim > 1:
+        hindex = _searchsorted_rows(np.sort(n, axis=-1), val)
+    else:
+        hindex = np.searchsorted(np.sort(n), val, side="right")
+    hindex = np.minimum(hindex, n.shape[-1] - 1)
+    lindex = np.maximum(hindex - 1, 0)
+    if n.ndim > 1:
+        relp_h, relp_l = (np.take_along_axis(relp, k, axis=-1) for k in (hindex, lindex))
+        n_h, n_l = (np.take_along_axis(n, k, axis=-1) for k in (hindex, lindex))
+    else:
+        relp_h, relp_l, n_h, n_l = relp[hindex], relp[lindex], n[hindex], n[lindex]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = np.where(hindex == 0, 0, (relp_h - relp_l) / (n_h - n_l))
+    b = relp_h - n_h * m
+
+    interp_val = m * val + b
+    return interp_val
+
+
+def _searchsorted_rows(sorted_rows, val):
+    """
+    Same as ``np.searchsorted(side="right")`` of each row of val in the same
+    row of sorted_rows, for all rows at once.
+
+    Data points and values of a row are sorted together, data points before
+    equal values, so the index of a value is the number of data points
+    before it.
+
+    """
+    size = sorted_rows.shape[-1]
+    keys = np.concatenate((sorted_rows, val), axis=-1)
+    is_val = np.broadcast_to(np.arange(keys.shape[-1]) >= size, keys.shape)
+    order = np.lexsort((is_val, keys), axis=-1)
+    counts = np.cumsum(order < size, axis=-1)
+    rows, cols = np.nonzero(order >= size)
+    hindex = np.empty(val.shape, dtype=int)
+    hindex[rows, order[rows, cols] - size] = counts[rows, cols]
+    return hindex
+
+
 def get_fixtures_path():
     """Returns the path to the fixtures directory."""
     return find_package_root("beatmap").joinpath("tests", "unit", "fixtures")
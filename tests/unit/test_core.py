@@ -1,3 +1,6 @@
+import os
+import sqlite3
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -7,6 +10,44 @@ import pandas as pd
 import beatmap as bt
 
 fixtures_path = bt.utils.get_fixtures_path()
+has_numba = bt.core._numba.HAS_NUMBA
+
+
+def assert_reference_agreement(temp, ref):
+    """
+    Asserts that bet results agree with those of bet_reference to within the
+    tolerances documented in bet.
+
+    """
+    scale = np.abs(ref.iso_df.bet).max()
+    round_off = len(ref.iso_df) * np.finfo(float).eps * scale
+    num_pts = np.asarray(ref.num_pts)
+    assert (np.asarray(temp.num_pts) == num_pts).all()
+    # intercepts within round-off of zero are set to zero
+    zeroed = (np.asarray(temp.intercept) == 0) & (np.asarray(ref.intercept) != 0)
+    assert (np.abs(np.asarray(ref.intercept)[zeroed]) <= round_off).all()
+    tolerances = {
+        "nm": (1e-8, 0, 1e-3, 0),
+        "ssa": (1e-8, 0, 1e-3, 0),
+        "slope": (1e-8, 1e-8 * scale, 1e-3, 1e-3 * scale),
+        "intercept": (1e-8, 1e-8 * scale, 1e-3, 1e-3 * scale),
+        "c": (1e-6, 0, 1e-2, 0),
+        "r": (0, 1e-8, 0, 1e-3),
+        "err": (0, 1e-8, 0, 1e-8),
+    }
+    for field, (rtol, atol, rtol_2, atol_2) in tolerances.items():
+        if getattr(ref, field) is None:
+            assert getattr(temp, field) is None
+            continue
+        value = np.asarray(getattr(temp, field))
+        expected = np.asarray(getattr(ref, field))
+        skip = np.zeros_like(zeroed)
+        if field in ["intercept", "c", "nm", "ssa"]:
+            skip = zeroed
+        cases = [(num_pts > 2, rtol, atol), (num_pts == 2, rtol_2, atol_2)]
+        for cells, rt, at in cases:
+            cells = cells & ~skip
+            assert np.allclose(value[cells], expected[cells], rtol=rt, atol=at), field
 
 
 class TestCore(unittest.TestCase):
@@ -130,6 +171,16 @@ class TestCore(unittest.TestCase):
                                                    self.ok_bet_results.nm)
         assert np.all(temp == self.ok_check_3_result)
 
+    def test_check_3_arrays(self):
+        nm = self.ssa_test_bet_results.nm
+        iso_df = self.ssa_test_bet_results.iso_df
+        temp = bt.core.check_absorbed_amount(iso_df, nm)
+        reference = bt.core.check_absorbed_amount(iso_df, nm, backend="reference")
+        assert (temp == reference).all()
+        assert temp.dtype == reference.dtype
+        assert (bt.core.check_absorbed_amount(iso_df.n.values, nm) == temp).all()
+        assert (bt.core.check_absorbed_amount(iso_df.values, nm) == temp).all()
+
     def test_check_4(self):
         temp = bt.core.check_pressure_consistency(
             self.ok_bet_results.iso_df,
@@ -139,12 +190,58 @@ class TestCore(unittest.TestCase):
         )
         assert np.all(temp == self.ok_check_4_result)
 
+    def test_check_4_vectorized(self):
+        bet_results = self.ssa_test_bet_results
+        args = (bet_results.iso_df, bet_results.nm, bet_results.slope,
+                bet_results.intercept)
+        temp = bt.core.check_pressure_consistency(*args)
+        reference = bt.core.check_pressure_consistency(*args, backend="reference")
+        assert (temp == reference).all()
+        # complex and zero roots, nm beyond the data
+        iso_df = bet_results.iso_df
+        rng = np.random.default_rng(0)
+        nm = rng.uniform(0, 1.2 * iso_df.n.max(), 500)
+        slope = rng.uniform(-2, 2, 500) / nm
+        intercept = rng.uniform(-2, 2, 500) / nm
+        intercept[:50] = 0
+        temp = bt.core._bet._pressure_consistency_ranges(
+            iso_df.n.values, iso_df.relp.values, nm, slope, intercept)
+        reference = bt.core._bet._pressure_consistency_cells(iso_df, nm, slope, intercept)
+        assert (temp == reference).all()
+        assert 0 < temp.sum() < len(temp)
+
+    def test_check_4_tolerance(self):
+        bet_results = self.ssa_test_bet_results
+        args = (bet_results.iso_df, bet_results.nm, bet_results.slope,
+                bet_results.intercept)
+        difference = bt.core.pressure_consistency_difference(*args)
+        assert np.isnan(difference[0]).all() and np.isnan(difference[:, 0]).all()
+        tolerances = [0.01, 0.05, 0.1, 0.3]
+        temp = bt.core.pressure_consistency_sweep(difference, tolerances)
+        assert temp.shape == (4,) + difference.shape
+        assert (temp[2] == bt.core.check_pressure_consistency(*args)).all()
+        for tolerance, passed in zip(tolerances, temp):
+            for backend in bt.core.available_backends():
+                check4 = bt.core.check_pressure_consistency(*args, backend=backend,
+                                                            tolerance=tolerance)
+                assert (passed == check4).all()
+        assert 0 < temp[0].sum() < temp[-1].sum()
+        # isotherms stacked along a leading axis
+        stacked = bt.core.pressure_consistency_sweep(np.stack([difference] * 3),
+                                                     tolerances)
+        assert stacked.shape == (4, 3) + difference.shape
+        assert (stacked[:, 1] == temp).all()
+
     def test_check_5(self):
         temp = bt.core.check_enough_datapoints(self.ok_bet_results.iso_df)
         assert np.all(temp == self.ok_check_5_result)
 
         with self.assertRaises(TypeError):
             bt.core.check_enough_datapoints(self.ok_bet_results.iso_df, "five")
+        for points in [1, 3, 7]:
+            temp = bt.core.check_enough_datapoints(self.ok_bet_results.iso_df, points)
+            i, j = np.indices(temp.shape)
+            assert (temp == (i - j >= points - 1)).all()
 
     def test_bet(self):
         temp = bt.core.bet(self.ok_iso_df, 11.11, "test ok file")
@@ -159,6 +256,450 @@ class TestCore(unittest.TestCase):
         assert (temp.num_pts == self.ok_bet_results.num_pts).all()
         assert temp.info == self.ok_bet_results.info
 
+    def test_with_adsorbate(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        temp = bt.core.bet(iso_df, None, None)
+        assert temp.ssa is None
+        mask_results = bt.core.rouq_mask(*temp)
+        assert (mask_results.mask == self.ssa_test_mask_results.mask).all()
+        rescaled = bt.core.with_adsorbate(temp, 39, "rescaled")
+        assert (rescaled.ssa == self.ssa_test_bet_results.ssa).all()
+        assert rescaled.info == "rescaled"
+        assert rescaled.nm is temp.nm
+        doubled = bt.core.with_adsorbate(rescaled, 78)
+        assert np.allclose(doubled.ssa, 2 * rescaled.ssa, rtol=1e-12, atol=0)
+        assert doubled.info == "rescaled"
+        packed = bt.core.with_adsorbate(bt.core.bet(iso_df, None, None, packed=True), 39)
+        assert isinstance(packed.ssa, bt.core.PackedTriangle)
+        assert (packed.ssa.toarray() == self.ssa_test_bet_results.ssa).all()
+        # every function that computes a specific surface area accepts a_o=None
+        assert bt.core.bet_reference(iso_df, None, None).ssa is None
+        single = bt.core.single_point_bet(iso_df, None)
+        assert single.ssa is None
+        assert (single.nm == bt.core.single_point_bet(iso_df, 39).nm).all()
+        incremental = bt.core.IncrementalBET(None)
+        incremental.extend(iso_df.relp, iso_df.n)
+        assert incremental.bet_results().ssa is None
+        assert incremental.bet_results(packed=True).ssa is None
+        # functions that read the specific surface area ask for with_adsorbate
+        readers = [
+            lambda: bt.core.ssa_answer(temp, mask_results),
+            lambda: bt.core.ssa_answer(temp, mask_results, "points", backend="reference"),
+            lambda: bt.core.ssa_answers(temp, mask_results),
+            lambda: bt.core.pareto_front(temp, mask_results),
+            lambda: bt.core.min_points_sweep(temp, mask_results),
+            lambda: bt.core.SummedAreaIndex(temp, mask_results),
+            lambda: bt.core.run_beatmap(Path(fixtures_path, "vulcan_chex.csv"),
+                                        save_figures=False),
+        ]
+        for reader in readers:
+            with self.assertRaisesRegex(ValueError, "a_o"):
+                reader()
+        assert np.isclose(bt.core.ssa_answer(rescaled, mask_results),
+                          231.47986411971542, rtol=1e-8, atol=0)
+
+    def test_bet_reference(self):
+        ref = bt.core.bet_reference(self.ssa_test_bet_results.iso_df, 39,
+                                    "chex on carbon black")
+        assert_reference_agreement(self.ssa_test_bet_results, ref)
+        ref_mask = bt.core.rouq_mask(*ref)
+        assert (self.ssa_test_mask_results.mask == ref_mask.mask).all()
+
+        # noisy synthetic isotherm, without and with an a_o
+        rng = np.random.default_rng(7)
+        relp = np.sort(rng.uniform(0.01, 0.6, 40))
+        n = 2e-3 * 150 * relp / ((1 - relp) * (1 - relp + 150 * relp))
+        n = n * (1 + 1e-3 * rng.standard_normal(40))
+        iso_df = bt.io.import_list_data(relp, n).iso_df
+        for a_o in [None, 39]:
+            assert_reference_agreement(bt.core.bet(iso_df, a_o, None),
+                                       bt.core.bet_reference(iso_df, a_o, None))
+
+    def test_bet_error_blocks(self):
+        # errors must not depend on how ranges are split into blocks
+        block_size = bt.core._bet._ERROR_BLOCK_SIZE
+        try:
+            bt.core._bet._ERROR_BLOCK_SIZE = 1
+            temp = bt.core.bet(self.ssa_test_bet_results.iso_df, 39, "blocks")
+        finally:
+            bt.core._bet._ERROR_BLOCK_SIZE = block_size
+        assert np.allclose(temp.err, self.ssa_test_bet_results.err, rtol=1e-12, atol=0)
+        assert (temp.err[np.diag_indices(28)] == 0).all()
+
+        # nor on how the rows are split into blocks of ranges
+        block_size = bt.core._bet._RANGE_BLOCK_SIZE
+        try:
+            bt.core._bet._RANGE_BLOCK_SIZE = 5
+            dense = bt.core.bet(self.ssa_test_bet_results.iso_df, 39, "blocks")
+            packed = bt.core.bet(self.ssa_test_bet_results.iso_df, 39, "blocks",
+                                 packed=True, min_points=4)
+        finally:
+            bt.core._bet._RANGE_BLOCK_SIZE = block_size
+        for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+            expected = getattr(self.ssa_test_bet_results, field)
+            # errors are sums over the points of the block, equal to round-off
+            assert np.allclose(getattr(dense, field), expected, rtol=1e-12, atol=0)
+            expected = np.where(self.ssa_test_bet_results.num_pts >= 4, expected, 0)
+            assert np.allclose(getattr(packed, field), expected, rtol=1e-12, atol=0)
+
+    def test_bet_packed(self):
+        temp = bt.core.bet(self.ssa_test_bet_results.iso_df, 39, "packed", packed=True)
+        dense = self.ssa_test_bet_results
+        for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+            packed = getattr(temp, field)
+            assert isinstance(packed, bt.core.PackedTriangle)
+            assert packed.nbytes < getattr(dense, field).nbytes / 2
+            assert (np.asarray(packed) == getattr(dense, field)).all()
+        assert temp.ssa[9, 1] == dense.ssa[9, 1]
+        assert temp.ssa[1, 9] == 0
+        assert temp.ssa[-1, 0] == dense.ssa[27, 0]
+        # checks are evaluated on the packed cells
+        mask = bt.core.rouq_mask(*temp)
+        lower = np.tri(len(dense.iso_df), k=-1, dtype=bool)
+        for field in ["mask", "check1", "check2", "check3", "check4", "check5"]:
+            packed = getattr(mask, field)
+            assert isinstance(packed, bt.core.PackedTriangle)
+            expected = getattr(self.ssa_test_mask_results, field)
+            assert (packed.data == expected[lower]).all()
+        assert (mask.mask == self.ssa_test_mask_results.mask).all()
+        assert mask.mask[1, 9]
+        assert bt.core.ssa_answer(temp, mask) == bt.core.ssa_answer(
+            dense, self.ssa_test_mask_results)
+        kwargs = {"enforce_relative_pressure": False, "min_num_points": 3}
+        assert (bt.core.rouq_mask(*temp, **kwargs).mask
+                == bt.core.rouq_mask(*dense, **kwargs).mask).all()
+
+        packed = bt.core.PackedTriangle.from_dense(dense.c)
+        assert (packed.toarray() == dense.c).all()
+        with self.assertRaises(ValueError):
+            bt.core.PackedTriangle(np.zeros(5), 4)
+
+    def test_bet_batch(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        scale = np.array([[1.0], [1.05], [0.9]])
+        n = iso_df.n.values * scale
+        temp = bt.core.bet_batch(n, relp=iso_df.relp.values, a_o=39, info="batch")
+        assert len(temp.bet_results) == len(temp.mask_results) == 3
+        for s in range(3):
+            isotherm = bt.io.import_list_data(iso_df.relp.values, n[s], a_o=39)
+            bet_results = bt.core.bet(*isotherm)
+            mask_results = bt.core.rouq_mask(*bet_results)
+            for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+                assert np.allclose(getattr(temp.bet_results[s], field),
+                                   getattr(bet_results, field), rtol=1e-12, atol=0)
+            for field in ["mask", "check1", "check2", "check3", "check4", "check5"]:
+                assert (getattr(temp.mask_results[s], field)
+                        == getattr(mask_results, field)).all()
+            assert np.isclose(
+                bt.core.ssa_answer(temp.bet_results[s], temp.mask_results[s]),
+                bt.core.ssa_answer(bet_results, mask_results), rtol=1e-12, atol=0)
+
+        # isotherms with different numbers of points
+        ok_isotherm = bt.io.import_list_data(self.ok_iso_df.relp, self.ok_iso_df.n,
+                                             a_o=11.11, info="test ok file")
+        ssa_isotherm = bt.io.import_list_data(iso_df.relp, iso_df.n, a_o=39)
+        temp = bt.core.bet_batch([ssa_isotherm, ok_isotherm, ssa_isotherm])
+        assert [len(b.iso_df) for b in temp.bet_results] == [28, 6, 28]
+        assert (temp.mask_results[1].mask == self.ok_rouq_mask_result).all()
+        assert (temp.mask_results[0].mask == self.ssa_test_mask_results.mask).all()
+
+        # kernels of other backends are called once per isotherm
+        reference = bt.core.bet_batch([ssa_isotherm, ok_isotherm], backend="reference")
+        for s in range(2):
+            assert reference.bet_results[s].backend == "reference"
+            assert_reference_agreement(temp.bet_results[s], reference.bet_results[s])
+            assert (reference.mask_results[s].mask == temp.mask_results[s].mask).all()
+
+        # samples without an a_o have no ssa, as in bet
+        temp = bt.core.bet_batch(n, relp=iso_df.relp.values)
+        assert all(bet_results.ssa is None for bet_results in temp.bet_results)
+        long = pd.DataFrame({"sample_id": np.repeat([1, 2], len(iso_df)),
+                             "relp": np.tile(iso_df.relp, 2),
+                             "n": np.concatenate([n[0], n[1]])})
+        temp = bt.core.bet_batch(bt.io.import_long_data(long))
+        assert temp.bet_results[0].ssa is None
+        isotherm = bt.io.import_list_data(iso_df.relp.values, n[1])
+        assert np.allclose(temp.bet_results[1].nm, bt.core.bet(*isotherm).nm,
+                           rtol=1e-12, atol=0)
+        temp = bt.core.bet_batch(bt.io.import_long_data(long, a_o=39))
+        assert np.allclose(temp.bet_results[0].ssa, self.ssa_test_bet_results.ssa,
+                           rtol=1e-12, atol=0)
+
+    def test_run_beatmap_batch(self):
+        files = [
+            Path(fixtures_path, "vulcan_chex.csv"),
+            Path(fixtures_path, "test_ok.csv"),
+            Path(fixtures_path, "test_missing_file.csv"),
+        ]
+        temp = bt.core.run_beatmap_batch(files, a_o=39, n_workers=2)
+        assert list(temp.file) == [str(f) for f in files]
+        assert list(temp.valid) == [True, False, False]
+        assert np.isclose(temp.ssa[0], 231.47986411971542, rtol=1e-8, atol=0)
+        assert temp.begin_relp[0] < temp.end_relp[0]
+        assert temp.num_valid[0] > 0
+        bet_results = bt.core.bet(*bt.io.import_data(str(files[0]), None, 39))
+        best = bt.core.ssa_answers(bet_results, bt.core.rouq_mask(*bet_results), k=1)
+        assert temp.begin_relp[0] == best.loc[("error", 0), "begin_relp"]
+        assert temp.end_relp[0] == best.loc[("error", 0), "end_relp"]
+        assert temp.c[0] == best.loc[("error", 0), "c"]
+        assert temp.error[1].startswith("ValueError")
+        assert temp.error[2].startswith("FileNotFoundError")
+
+        temp = bt.core.run_beatmap_batch(str(Path(fixtures_path, "vulcan*.csv")),
+                                         a_o=39, ssa_criterion="points")
+        assert len(temp) == 1
+        assert np.isclose(temp.ssa[0], 228.96104514464378, rtol=1e-8, atol=0)
+
+        # workers share a result cache, a rerun reads the results from it
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                temp = bt.core.run_beatmap_batch(files, a_o=39, n_workers=2,
+                                                 cache=directory)
+                assert list(temp.valid) == [True, False, False]
+                assert np.isclose(temp.ssa[0], 231.47986411971542, rtol=1e-8, atol=0)
+            assert len(bt.io.ResultCache(directory)) == 2
+
+        # results of the files that could be analyzed are archived in order
+        with tempfile.TemporaryDirectory() as directory:
+            temp = bt.core.run_beatmap_batch(files, a_o=39, n_workers=2,
+                                             archive=directory)
+            assert list(temp.archive_index) == [0, 1, -1]
+            archive = bt.io.ResultArchive(directory)
+            assert list(archive.summary().file) == [str(f) for f in files[:2]]
+            assert archive.get(0, "ssa")[27, 0] > 0
+
+            # and summarized in a store
+            path = Path(directory, "results.sqlite")
+            temp = bt.core.run_beatmap_batch(files, a_o=39, n_workers=2, store=path)
+            assert list(temp.store_id) == [1, 2, -1]
+            with bt.io.ResultStore(path) as store:
+                assert np.isclose(store.query().ssa_error[1], 231.47986411971542,
+                                  rtol=1e-8, atol=0)
+                temp = bt.core.run_beatmap_batch(files, a_o=39, store=store)
+                assert list(temp.store_id) == [3, 4, -1]
+                # stores that are passed in are left open
+                assert len(store) == 4
+            # stores opened from a path are closed
+            with bt.core._bet._result_store(path) as store:
+                assert len(store) == 4
+            with self.assertRaises(sqlite3.ProgrammingError):
+                len(store)
+
+    def test_incremental_bet(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        temp = bt.core.IncrementalBET(a_o=39, info="incremental")
+        for num_pts in [12, 28]:
+            temp.extend(iso_df.relp[len(temp):num_pts], iso_df.n[len(temp):num_pts])
+            assert len(temp) == num_pts
+            df = iso_df.iloc[:num_pts].reset_index(drop=True)
+            bet_results = bt.core.bet(df, 39, "incremental")
+            mask_results = bt.core.rouq_mask(*bet_results)
+            inc_bet_results = temp.bet_results()
+            inc_mask_results = temp.rouq_mask()
+            for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+                assert np.allclose(getattr(inc_bet_results, field),
+                                   getattr(bet_results, field), rtol=1e-8, atol=1e-12)
+            for field in ["mask", "check1", "check2", "check3", "check4", "check5"]:
+                assert (getattr(inc_mask_results, field)
+                        == getattr(mask_results, field)).all()
+
+        assert np.isclose(bt.core.ssa_answer(inc_bet_results, inc_mask_results),
+                          231.47986411971542, rtol=1e-8, atol=0)
+        packed = temp.bet_results(packed=True)
+        assert (np.asarray(packed.ssa) == inc_bet_results.ssa).all()
+
+        with self.assertRaises(ValueError):
+            temp.append(0.95, 0)
+
+    def test_bet_constraints(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        full = self.ssa_test_bet_results
+        temp = bt.core.bet(iso_df, 39, "constrained", min_points=4, max_points=12,
+                           relp_window=(0.05, 0.3))
+        i, j = np.indices(full.ssa.shape)
+        num_pts = i - j + 1
+        keep = ((num_pts >= 4) & (num_pts <= 12) & (i > j)
+                & (iso_df.relp.values[j] >= 0.05) & (iso_df.relp.values[i] <= 0.3))
+        assert keep.any() and not keep[i > j].all()
+        for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+            assert (getattr(temp, field)[~keep] == 0).all()
+            assert np.allclose(getattr(temp, field)[keep], getattr(full, field)[keep],
+                               rtol=1e-8, atol=0)
+
+        mask = bt.core.rouq_mask(*temp,
+                                 enforce_y_intercept_positive=False,
+                                 enforce_pressure_increasing=False,
+                                 enforce_absorbed_amount=False,
+                                 enforce_relative_pressure=False,
+                                 enforce_enough_datapoints=False)
+        assert (~mask.mask == keep).all()
+
+    @unittest.skipIf(not has_numba, "numba is not installed")
+    def test_numba_bet(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        temp = bt.core.bet(iso_df, 39, "numba", backend="numba")
+        ref = bt.core.bet(iso_df, 39, "numba", backend="numpy")
+        for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+            assert np.allclose(getattr(temp, field), getattr(ref, field),
+                               rtol=1e-12, atol=0)
+
+        os.environ["BEATMAP_BACKEND"] = "numba"
+        try:
+            temp = bt.core.bet(iso_df, 39, "numba")
+        finally:
+            del os.environ["BEATMAP_BACKEND"]
+        assert np.allclose(temp.err, ref.err, rtol=1e-12, atol=0)
+
+    @unittest.skipIf(not has_numba, "numba is not installed")
+    def test_numba_check_3(self):
+        for bet_results in [self.ok_bet_results, self.ssa_test_bet_results]:
+            temp = bt.core.check_absorbed_amount(bet_results.iso_df, bet_results.nm,
+                                                 backend="numba")
+            ref = bt.core.check_absorbed_amount(bet_results.iso_df, bet_results.nm,
+                                                backend="numpy")
+            assert (temp == ref).all()
+
+    @unittest.skipIf(not has_numba, "numba is not installed")
+    def test_numba_check_4(self):
+        for bet_results in [self.ok_bet_results, self.ssa_test_bet_results]:
+            args = (bet_results.iso_df, bet_results.nm, bet_results.slope,
+                    bet_results.intercept)
+            temp = bt.core.check_pressure_consistency(*args, backend="numba")
+            ref = bt.core.check_pressure_consistency(*args, backend="numpy")
+            assert (temp == ref).all()
+        temp = bt.core.rouq_mask(*self.ssa_test_bet_results, backend="numba")
+        assert (temp.mask == self.ssa_test_mask_results.mask).all()
+
+    def test_backend(self):
+        iso_df = self.ok_iso_df
+        with self.assertRaises(ValueError):
+            bt.core.bet(iso_df, 11.11, "test ok file", backend="fortran")
+        with self.assertRaises(ValueError):
+            bt.core.set_backend("fortran")
+        assert self.ok_bet_results.backend == "numpy"
+        assert self.ok_mask_results.backend == "numpy"
+        # every backend agrees with the original loops
+        ref = bt.core.bet_reference(iso_df, 11.11, "test ok file")
+        for name in bt.core.available_backends():
+            temp = bt.core.bet(iso_df, 11.11, "test ok file", backend=name)
+            assert temp.backend == name
+            assert_reference_agreement(temp, ref)
+            mask = bt.core.rouq_mask(*temp, backend=name)
+            assert mask.backend == name
+            assert np.all(mask.mask == self.ok_rouq_mask_result)
+            single = bt.core.single_point_bet(iso_df, 11.11, backend=name)
+            assert single.backend == name
+        # a global default, overridden per call
+        try:
+            bt.core.set_backend("reference")
+            assert bt.core.bet(iso_df, 11.11, "test ok file").backend == "reference"
+            temp = bt.core.bet(iso_df, 11.11, "test ok file", backend="numpy")
+            assert temp.backend == "numpy"
+        finally:
+            bt.core.set_backend(None)
+
+    def test_register_backend(self):
+        iso_df = self.ok_iso_df
+        calls = []
+
+        def fit_error(*args):
+            calls.append("fit_error")
+            return bt.core._bet._fit_error(*args)
+
+        with self.assertRaises(ValueError):
+            bt.core.register_backend("test", sort=sorted)
+        try:
+            bt.core.register_backend("test", fit_error=fit_error)
+            bt.core.register_backend("missing", available=False, fit_error=fit_error)
+            assert "test" in bt.core.available_backends()
+            assert "missing" not in bt.core.available_backends()
+            # operations the backend does not provide are done by numpy
+            temp = bt.core.bet(iso_df, 11.11, "test ok file", backend="test")
+            assert calls == ["fit_error"]
+            assert temp.backend == "test"
+            assert np.allclose(temp.ssa, self.ok_bet_results.ssa, rtol=1e-8, atol=0)
+            # unavailable backends fall back on numpy, with a warning the first time
+            with self.assertLogs("beatmap.core._backends", "WARNING") as logs:
+                for _ in range(2):
+                    temp = bt.core.bet(iso_df, 11.11, "test ok file", backend="missing")
+                    mask = bt.core.rouq_mask(*temp, backend="missing")
+            assert len(logs.records) == 1
+            assert calls == ["fit_error"]
+            assert temp.backend == mask.backend == "numpy"
+
+            # loaders are called once, the first time the backend is selected
+            def loader():
+                calls.append("loader")
+                return {"fit_error": fit_error}
+
+            def missing_loader():
+                raise ImportError("No module named 'fortran'")
+
+            bt.core.register_backend("lazy", loader=loader)
+            bt.core.register_backend("lazy_missing", loader=missing_loader)
+            assert calls == ["fit_error"]
+            for _ in range(2):
+                temp = bt.core.bet(iso_df, 11.11, "test ok file", backend="lazy")
+                assert temp.backend == "lazy"
+            assert calls == ["fit_error", "loader", "fit_error", "fit_error"]
+            temp = bt.core.bet(iso_df, 11.11, "test ok file", backend="lazy_missing")
+            assert temp.backend == "numpy"
+            assert "lazy_missing" not in bt.core.available_backends()
+        finally:
+            for name in ["test", "missing", "lazy", "lazy_missing"]:
+                bt.core._backends._registry.pop(name, None)
+                bt.core._backends._warned.discard(name)
+
+    def test_single_point_bet(self):
+        iso_df = self.ssa_test_bet_results.iso_df
+        temp = bt.core.single_point_bet(iso_df, 39)
+        reference = bt.core.single_point_bet(iso_df, 39, backend="reference")
+        assert (temp.ssa == reference.ssa).all()
+        assert (temp.nm == reference.nm).all()
+        nm = np.median(iso_df.n[2:5]) * (1 - np.median(iso_df.relp[2:5]))
+        assert temp.nm[5, 2] == nm
+        assert (np.triu(temp.ssa) == 0).all()
+
+    def test_rouq_mask_cache(self):
+        bet_results = self.ssa_test_bet_results
+        temp = bt.core.RouqMaskCache(*bet_results)
+        settings = [{}, {"enforce_relative_pressure": False},
+                    {"enforce_y_intercept_positive": False, "min_num_points": 3},
+                    {"enforce_enough_datapoints": False,
+                     "enforce_absorbed_amount": False},
+                    {"min_num_points": 12}, {"min_num_points": 5}]
+        for kwargs in settings:
+            mask_results = bt.core.rouq_mask(*bet_results, **kwargs)
+            cached = temp.rouq_mask(**kwargs)
+            for field in ["mask", "check1", "check2", "check3", "check4", "check5"]:
+                assert (getattr(cached, field) == getattr(mask_results, field)).all()
+                assert getattr(cached, field).dtype == getattr(mask_results, field).dtype
+            assert cached.backend == mask_results.backend
+        num_points = len(bet_results.iso_df)
+        assert temp.nbytes < 10 * num_points ** 2 / 8
+
+    def test_shared_frame_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        iso_df = self.ssa_test_bet_results.iso_df[["relp", "n", "bet"]].copy()
+        original = iso_df.copy()
+
+        def analyze(k):
+            bet_results = bt.core.bet(iso_df, 39, f"thread {k}")
+            mask_results = bt.core.rouq_mask(*bet_results)
+            imported = bt.io.import_data(iso_df[["relp", "n"]], f"thread {k}", 39)
+            return (bt.core.ssa_answer(bet_results, mask_results), mask_results.mask,
+                    imported.iso_df)
+
+        expected = analyze(0)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(analyze, range(32)))
+        for ssa, mask, imported in results:
+            assert ssa == expected[0]
+            assert (mask == expected[1]).all()
+            assert imported.equals(expected[2])
+        assert iso_df.equals(original)
+
     def test_rouq_mask(self):
         # testing with ok data
         temp = bt.core.rouq_mask(
@@ -173,11 +714,11 @@ class TestCore(unittest.TestCase):
         temp = bt.core.ssa_answer(
             self.ssa_test_bet_results, self.ssa_test_mask_results, "error"
         )
-        assert temp == 231.47986411971542
+        assert np.isclose(temp, 231.47986411971542, rtol=1e-8, atol=0)
         temp = bt.core.ssa_answer(
             self.ssa_test_bet_results, self.ssa_test_mask_results, "points"
         )
-        assert temp == 228.96104514464378
+        assert np.isclose(temp, 228.96104514464378, rtol=1e-8, atol=0)
 
         with self.assertRaises(ValueError):
             bt.core.ssa_answer(
@@ -187,6 +728,116 @@ class TestCore(unittest.TestCase):
         with self.assertRaises(ValueError):
             bt.core.ssa_answer(self.ok_bet_results, self.ok_mask_results)
 
+    def test_ssa_answers(self):
+        bet_results = self.ssa_test_bet_results
+        mask_results = self.ssa_test_mask_results
+        temp = bt.core.ssa_answers(bet_results, mask_results, k=3)
+        assert temp.index.names == ["criterion", "rank"]
+        for criterion in ["error", "points", "max", "min"]:
+            ranked = temp.loc[criterion]
+            assert list(ranked.index) == [0, 1, 2]
+            ssa = bt.core.ssa_answer(bet_results, mask_results, criterion)
+            assert ranked.ssa[0] == ssa
+            assert (bet_results.ssa[ranked.end, ranked.begin] == ranked.ssa).all()
+            assert (ranked.num_pts == ranked.end - ranked.begin + 1).all()
+        assert temp.loc["error"].err.is_monotonic_increasing
+        assert temp.loc["max"].ssa.is_monotonic_decreasing
+        assert temp.loc["min"].ssa.is_monotonic_increasing
+
+        # ties are broken by error, then by position
+        ssa = np.round(bet_results.ssa, -1)
+        tied = bt.core.ssa_answers(bet_results._replace(ssa=ssa), mask_results, k=50,
+                                   criteria=["max"])
+        top = tied[tied.ssa == tied.ssa.max()]
+        assert len(top) > 1
+        assert (np.diff(top.end * 100 + top.begin) > 0).all()
+        points = temp.loc["points"]
+        assert (np.diff(points.num_pts) <= 0).all()
+
+        with self.assertRaises(ValueError):
+            bt.core.ssa_answers(self.ok_bet_results, self.ok_mask_results)
+
+    def test_pareto_front(self):
+        bet_results = self.ssa_test_bet_results
+        mask_results = bt.core.rouq_mask(*bet_results, enforce_relative_pressure=False,
+                                         enforce_enough_datapoints=False)
+        temp = bt.core.pareto_front(bet_results, mask_results)
+        assert temp.err.is_monotonic_increasing
+        assert (bet_results.ssa[temp.end, temp.begin] == temp.ssa).all()
+
+        # same front as comparing all pairs of ranges
+        valid = ~mask_results.mask
+        err = bet_results.err[valid]
+        num_pts = bet_results.num_pts[valid]
+        deviation = abs(bet_results.ssa[valid] - np.median(bet_results.ssa[valid]))
+        at_least = ((err[:, None] <= err) & (num_pts[:, None] >= num_pts)
+                    & (deviation[:, None] <= deviation))
+        better = ((err[:, None] < err) | (num_pts[:, None] > num_pts)
+                  | (deviation[:, None] < deviation))
+        front = ~(at_least & better).any(axis=0)
+        assert len(temp) == front.sum() > 1
+        assert set(temp.err) == set(err[front])
+        assert np.allclose(np.sort(temp.ssa_deviation), np.sort(deviation[front]))
+
+    def test_summed_area_index(self):
+        bet_results = self.ssa_test_bet_results
+        mask_results = bt.core.rouq_mask(*bet_results, enforce_relative_pressure=False)
+        temp = bt.core.SummedAreaIndex(bet_results, mask_results)
+        relp = bet_results.iso_df.relp.values
+        end, begin = np.indices(mask_results.mask.shape)
+        valid = ~mask_results.mask
+        for begin_relp, end_relp in [((0.01, 0.1), (0.15, 0.3)), ((0.05, 0.05), (0, 1)),
+                                     ((0.2, 0.1), (0, 1))]:
+            window = (valid
+                      & (relp[begin] >= begin_relp[0]) & (relp[begin] <= begin_relp[1])
+                      & (relp[end] >= end_relp[0]) & (relp[end] <= end_relp[1]))
+            for quantity in ["ssa", "err", "c"]:
+                stats = temp.query(begin_relp, end_relp, quantity)
+                values = getattr(bet_results, quantity)[window]
+                assert stats.count == window.sum()
+                if stats.count:
+                    assert np.isclose(stats.mean, values.mean(), rtol=1e-10, atol=0)
+                    assert np.isclose(stats.var, values.var(), rtol=1e-6, atol=1e-10)
+                else:
+                    assert np.isnan(stats.mean) and np.isnan(stats.var)
+        assert temp.query().count == valid.sum()
+
+        # many windows at once
+        stats = temp.query((np.array([0.01, 0.02, 0.05]), 0.1), (0.15, 0.3))
+        assert stats.count.shape == (3,)
+        assert stats.count[0] == temp.query((0.01, 0.1), (0.15, 0.3)).count
+
+        with self.assertRaises(ValueError):
+            temp.query(quantity="nm")
+
+    def test_min_points_sweep(self):
+        bet_results = self.ssa_test_bet_results
+        mask_results = bt.core.rouq_mask(*bet_results, enforce_relative_pressure=False)
+        temp = bt.core.min_points_sweep(bet_results, mask_results)
+        assert list(temp.index) == list(range(2, 29))
+        assert list(temp.columns) == ["num_valid", "error", "points", "max", "min"]
+        for points in temp.index:
+            mask_results = bt.core.rouq_mask(*bet_results,
+                                             enforce_relative_pressure=False,
+                                             min_num_points=points)
+            assert temp.num_valid[points] == (~mask_results.mask).sum()
+            for criterion in ["error", "points", "max", "min"]:
+                try:
+                    ssa = bt.core.ssa_answer(bet_results, mask_results, criterion)
+                except Exception:
+                    ssa = np.nan
+                assert np.array_equal(temp[criterion][points], ssa, equal_nan=True)
+        assert temp.num_valid.iloc[0] > 0
+        assert temp.num_valid.iloc[-1] == 0
+
+        temp = bt.core.min_points_sweep(bet_results, self.ssa_test_mask_results,
+                                        min_num_points=[5, 40], criteria=["max"])
+        assert list(temp.columns) == ["num_valid", "max"]
+        assert np.isnan(temp["max"][40])
+        with self.assertRaises(ValueError):
+            bt.core.min_points_sweep(bet_results, self.ssa_test_mask_results,
+                                     criteria=["median"])
+
 
 if __name__ == "__main__":
 
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -150,6 +151,21 @@ class TestIO(unittest.TestCase):
         with self.assertRaises(ValueError):
             bt.io.import_data(**self.a_o_string_test)
 
+    def test_import_data_frame(self):
+        # the caller's frame is left untouched
+        df = pd.read_csv(self.ok_test["file"], header=None, names=["p", "moles"])
+        original = df.copy()
+        temp = bt.io.import_data(df, "frame", 11.11)
+        assert df.equals(original)
+        assert list(temp.iso_df.columns) == ["relp", "n", "bet"]
+        assert temp.iso_df.relp.equals(original.p.rename("relp"))
+
+        # the adsorbate area is optional
+        temp = bt.io.import_data(df)
+        assert temp.a_o is None
+        temp = bt.io.import_list_data(df.p, df.moles)
+        assert temp.a_o is None
+
     def test_import_list_data(self):
         # test ok lists
         temp = bt.io.import_list_data(**self.list_data_test)
@@ -168,6 +184,209 @@ class TestIO(unittest.TestCase):
             bt.io.import_list_data(**self.ao_not_numeric_list_test)
 
 
+    def test_result_cache(self):
+        isotherm_data = bt.io.import_data(**self.ok_test)
+        expected = bt.core.bet(*isotherm_data)
+        expected_mask = bt.core.rouq_mask(*expected, min_num_points=3)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = bt.io.ResultCache(directory)
+            temp = cache.analyze(*isotherm_data, min_num_points=3)
+            assert len(cache) == 1
+            # second analysis is read from the file
+            temp = cache.analyze(*isotherm_data, min_num_points=3)
+            for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+                assert np.array_equal(getattr(temp.bet_results, field),
+                                      getattr(expected, field))
+            for field in ["mask", "check1", "check2", "check3", "check4", "check5"]:
+                assert np.array_equal(getattr(temp.mask_results, field),
+                                      getattr(expected_mask, field))
+                assert (getattr(temp.mask_results, field).dtype
+                        == np.asarray(getattr(expected_mask, field)).dtype)
+            assert temp.bet_results.iso_df.equals(expected.iso_df)
+            assert temp.bet_results.info == self.ok_test["info"]
+
+            # a_o and settings are part of the key, info is not
+            key = cache.key(isotherm_data.iso_df, 11.11, min_num_points=3)
+            assert key != cache.key(isotherm_data.iso_df, 16.2, min_num_points=3)
+            assert key != cache.key(isotherm_data.iso_df, 11.11, min_num_points=4)
+            temp = cache.analyze(isotherm_data.iso_df, 11.11, "other")
+            assert temp.bet_results.info == "other"
+            temp = cache.analyze(isotherm_data.iso_df, 11.11, packed=True)
+            temp = cache.analyze(isotherm_data.iso_df, 11.11, packed=True)
+            assert isinstance(temp.bet_results.nm, bt.core.PackedTriangle)
+            assert np.array_equal(temp.bet_results.nm, expected.nm)
+            assert len(cache) == 3
+
+            # results without ssa or mask
+            bet_results = bt.core.bet(isotherm_data.iso_df, None, None)
+            cache.save("no_ssa", bet_results)
+            temp = cache.load("no_ssa")
+            assert temp.bet_results.ssa is None and temp.mask_results is None
+            assert cache.load("missing") is None
+
+            # unreadable files are dropped
+            Path(directory, "broken.npz").write_bytes(b"not a zip file")
+            assert cache.load("broken") is None
+            assert "broken" not in cache
+
+            # least recently used results are evicted
+            cache.max_bytes = cache.nbytes - 1
+            cache.load("no_ssa")
+            cache.save("last", bet_results)
+            assert "last" in cache and "no_ssa" in cache
+            assert cache.nbytes <= cache.max_bytes
+            assert not list(Path(directory).glob("*.tmp"))
+            cache.clear()
+            assert len(cache) == 0
+
+    def test_result_archive(self):
+        isotherm_data = bt.io.load_vulcan_dataset()
+        dense = bt.core.bet(*isotherm_data)
+        mask_results = bt.core.rouq_mask(*dense)
+        short = bt.core.bet(bt.io.import_data(**self.ok_test).iso_df, None, "short",
+                            packed=True)
+        with tempfile.TemporaryDirectory() as directory:
+            archive = bt.io.ResultArchive(directory)
+            assert archive.append(dense, mask_results, file="vulcan.csv") == 0
+            assert archive.extend([short, dense]) == [1, 2]
+
+            # reopened archives read the manifest
+            archive = bt.io.ResultArchive(directory)
+            assert len(archive) == 3
+            summary = archive.summary()
+            assert list(summary.num_points) == [28, 6, 28]
+            assert list(summary.has_mask) == [True, False, False]
+            assert summary.file[0] == "vulcan.csv"
+
+            err = archive.get(0, "err")
+            assert isinstance(err, bt.core.PackedTriangle)
+            assert isinstance(err.data.base, np.memmap)
+            assert not err.data.flags.writeable
+            assert np.array_equal(err, dense.err)
+            assert np.array_equal(archive.get(1, "nm"), short.nm)
+            assert archive.get(1, "ssa") is None
+            assert archive.get(1, "valid") is None
+            assert np.array_equal(archive.get(2, "relp"), dense.iso_df.relp)
+
+            temp = archive.load(0)
+            for field in ["intercept", "nm", "slope", "ssa", "c", "err", "r", "num_pts"]:
+                assert np.array_equal(getattr(temp.bet_results, field),
+                                      getattr(dense, field))
+            assert temp.bet_results.iso_df.equals(dense.iso_df)
+            assert temp.bet_results.info == dense.info
+            assert np.array_equal(temp.mask_results.mask, mask_results.mask)
+            assert archive.load(1).mask_results is None
+
+            with self.assertRaises(IndexError):
+                archive.get(3, "err")
+            with self.assertRaises(ValueError):
+                archive.get(0, "mask")
+
+            # data of an interrupted append is overwritten
+            with open(Path(directory, "err.bin"), "ab") as f:
+                f.write(b"partial")
+            archive.append(short)
+            assert np.array_equal(archive.get(3, "err"), short.err)
+            size = Path(directory, "err.bin").stat().st_size
+            assert size == 8 * (2 * 28 * 27 // 2 + 2 * 6 * 5 // 2)
+
+    def test_result_store(self):
+        isotherm_data = bt.io.load_vulcan_dataset()
+        bet_results = bt.core.bet(*isotherm_data)
+        mask_results = bt.core.rouq_mask(*bet_results)
+        short = bt.core.bet(*bt.io.import_data(**self.ok_test))
+        short_mask = bt.core.rouq_mask(*short)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "results.sqlite")
+            with bt.io.ResultStore(path) as store:
+                assert store.insert(bet_results, mask_results, file="vulcan.csv") == 1
+                ids = store.insert_many([short, bet_results], [short_mask, mask_results])
+                assert ids == [2, 3]
+
+            with bt.io.ResultStore(path) as store:
+                assert len(store) == 3
+                temp = store.query()
+                assert list(temp.index) == [1, 2, 3]
+                row = temp.loc[1]
+                assert row.file == "vulcan.csv"
+                assert row.num_points == 28
+                assert row.num_valid == (~mask_results.mask).sum()
+                for criterion in ["error", "points", "max", "min"]:
+                    ssa = bt.core.ssa_answer(bet_results, mask_results, criterion)
+                    assert np.isclose(row[f"ssa_{criterion}"], ssa, rtol=1e-12)
+                assert row.begin_relp < row.end_relp
+                # isotherms without valid ranges have no answers
+                assert temp.loc[2].num_valid == 0 and np.isnan(temp.loc[2].ssa_error)
+                assert temp.loc[1].input_hash == temp.loc[3].input_hash
+                assert temp.loc[1].input_hash != temp.loc[2].input_hash
+
+                ssa = row.ssa_error
+                temp = store.query(ssa_error=(ssa - 1, ssa + 1), c=(row.c, None))
+                assert list(temp.index) == [1, 3]
+                assert len(store.query(ssa_error=(None, ssa - 1))) == 0
+                assert list(store.query(file=None).index) == [2, 3]
+                temp = store.query(order_by="-num_valid", limit=np.int64(1))
+                assert list(temp.index) == [1]
+                temp = store.sql("SELECT COUNT(*) AS n FROM samples WHERE c > ?", (0,))
+                assert temp.n[0] == 2
+                plan = store.sql("EXPLAIN QUERY PLAN SELECT * FROM samples "
+                                 "WHERE ssa_error BETWEEN 500 AND 800")
+                assert "samples_ssa_error" in plan.detail.iloc[0]
+
+                with self.assertRaises(ValueError):
+                    store.query(ssa=(0, 1))
+                with self.assertRaises(ValueError):
+                    store.query(order_by="ssa; DROP TABLE samples")
+
+                # without an a_o only the ssa columns are NULL
+                no_ssa = bt.core.bet(isotherm_data.iso_df, None, None)
+                assert store.insert(no_ssa, mask_results) == 4
+                temp = store.query()
+                best = bt.core.ssa_answers(bet_results, mask_results, k=1).loc["error"]
+                for column in ["c", "nm", "err", "num_pts", "begin_relp", "end_relp"]:
+                    assert temp.loc[4, column] == temp.loc[1, column]
+                for column in ["c", "err", "num_pts", "begin_relp", "end_relp"]:
+                    assert temp.loc[4, column] == best[column].iloc[0]
+                for criterion in ["error", "points", "max", "min"]:
+                    assert np.isnan(temp.loc[4, f"ssa_{criterion}"])
+
+    def test_import_long_data(self):
+        vulcan = bt.io.load_vulcan_dataset().iso_df
+        ok = bt.io.import_data(**self.ok_test).iso_df
+        # samples interleaved in the table, points keep their order
+        long = pd.concat([
+            pd.DataFrame({"sample_id": "b", "relp": vulcan.relp, "n": vulcan.n}),
+            pd.DataFrame({"sample_id": "a", "relp": ok.relp, "n": ok.n}),
+        ]).sample(frac=1, random_state=0).sort_index(kind="stable")
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, "long.csv")
+            long.to_csv(path, index=False)
+            temp = bt.io.import_long_data(path, a_o=11.11)
+        assert [x.info for x in temp] == ["a", "b"]
+        assert temp[0].file == path and temp[0].a_o == 11.11
+        assert np.allclose(temp[0].iso_df, ok[["relp", "n", "bet"]], rtol=1e-12, atol=0)
+        assert np.allclose(temp[1].iso_df, vulcan[["relp", "n", "bet"]],
+                           rtol=1e-12, atol=0)
+
+        # other column names, and stacks of samples with the same length
+        frame = pd.DataFrame({"id": [2, 1, 2, 1], "p": [0.1, 0.1, 0.2, 0.2],
+                              "q": [1.0, 2.0, 1.5, 2.5]})
+        temp = bt.io.import_long_data(frame, sample_col="id", relp_col="p",
+                                      n_col="q", stack=True)
+        assert list(temp.sample_id) == [1, 2] and temp.info == ["1", "2"]
+        assert np.array_equal(temp.n, [[2.0, 2.5], [1.0, 1.5]])
+        assert np.array_equal(temp.relp, [[0.1, 0.2], [0.1, 0.2]])
+
+        with self.assertRaises(ValueError):
+            bt.io.import_long_data(long, stack=True)
+        with self.assertRaises(ValueError):
+            bt.io.import_long_data(long.assign(n=long.n.where(long.sample_id == "a", 0)))
+        with self.assertRaises(ValueError):
+            bt.io.import_long_data(long, a_o="cat")
+        if not bt.io._dataio.HAS_PYARROW:
+            with self.assertRaises(ImportError):
+                bt.io.import_long_data("long.parquet")
+
     def test_load_vulcan_dataset(self):
         data = bt.io.load_vulcan_dataset()
         assert isinstance(data, bt.io._dataio.iso_data)
@@ -94,6 +94,29 @@ class BaseTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             bt.utils.lin_interp(self.empty_lin_interp_df, 0.007)
 
+    def test_lin_interp_array(self):
+        df = self.lin_interp_df
+        val = np.array([0.0005, 0.001, 0.0015, 0.003, 0.004, 0.0058, 0.006, 0.007])
+        temp = bt.utils.lin_interp_array(df.n, df.relp, val)
+        assert temp.shape == val.shape
+        assert (temp == [bt.utils.lin_interp(df, v) for v in val]).all()
+        assert temp[2] == 0.15
+        assert temp[-1] == 0.6999999999999997
+
+        temp = bt.utils.lin_interp_array(df.n.values, df.relp.values, val.reshape(2, 4))
+        assert temp.shape == (2, 4)
+        assert bt.utils.lin_interp_array(df.n, df.relp, 0.0015) == 0.15
+
+        # isotherms stacked along the leading axis
+        n = np.stack((df.n.values, df.n.values * 2))
+        relp = np.stack((df.relp.values, df.relp.values))
+        temp = bt.utils.lin_interp_array(n, relp, np.stack((val, val * 2)))
+        assert (temp[0] == bt.utils.lin_interp_array(df.n, df.relp, val)).all()
+        assert (temp[1] == bt.utils.lin_interp_array(n[1], relp[1], val * 2)).all()
+
+        with self.assertRaises(ValueError):
+            bt.utils.lin_interp_array([], [], 0.007)
+
 
 if __name__ == "__main__":
 